@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from google.genai import types
+from novel_store import atomic_write_json, read_json, work_id_of
+from run_report import report
+from translator import PROMPTS, TITLE_PROMPT, SAFETY_CONFIG, split_chunks, is_failed, report_summaries
+from segments import source_hash
+from model_router import quality_problem
+from translate_all import (store, cache, translator, glossary, router, client, FETCH_WORKERS, load_works, get_toc,
+                           load_history, seed_history, save_to_history, save_to_json, get_content_and_next_link)
+
+# ==========================================
+# 📦 โหมดแปลแบบ Batch (งานย้อนหลังจำนวนมาก)
+# ==========================================
+# python batch_translate.py               -> ส่งงาน (หรือรองานที่ส่งค้างไว้) แล้วรอผล
+# python batch_translate.py --no-wait     -> ส่ง/เช็คครั้งเดียวแล้วจบ (รันรอบหน้าค่อยเก็บผล)
+#
+# 1) ดึงทุกตอนที่ค้างตาม works.json -> หั่นก้อนแบบเดียวกับ translate_smart
+# 2) เขียนคำขอ (ก้อนเนื้อหา + ชื่อตอน) ลงไฟล์ JSONL -> อัปโหลด -> สร้าง batch job เดียว
+# 3) รอจนเสร็จ -> ผลที่สำเร็จใส่แคชคำแปล
+# 4) บันทึกทีละตอนผ่าน translator.translate_segments / translate_titles เดิม: ก้อนที่สำเร็จเป็น cache hit
+#    ส่วนก้อนที่โดนบล็อก/พัง/ไม่ผ่านตรวจคุณภาพเท่านั้นที่วิ่งเข้า router (ชั้น strong / Soften -> Summary) แบบ interactive
+#
+# สถานะงานเก็บไว้ใน .cache/batch/ (workflow แคชไว้ให้) -> job ที่ยังไม่เสร็จในรอบนี้รอเก็บผลรอบหน้าได้
+
+BATCH_DIR = os.path.join(".cache", "batch")
+STATE_FILE = os.path.join(BATCH_DIR, "job.json")
+BATCH_MODEL = router.models[0]   # ชั้นที่ถูกที่สุดของ model_router (ตัวที่ไม่ผ่านตรวจค่อยยกชั้นตอน apply)
+POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "60"))
+MAX_WAIT_MINUTES = float(os.getenv("BATCH_MAX_WAIT_MINUTES", "300"))
+
+DONE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED", "JOB_STATE_FAILED",
+               "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+SAFETY_SETTINGS = [{"category": s.category.value if hasattr(s.category, "value") else s.category,
+                    "threshold": s.threshold.value if hasattr(s.threshold, "value") else s.threshold}
+                   for s in SAFETY_CONFIG.safety_settings]
+
+
+# ==========================================
+# 1) เก็บตอนที่ค้าง
+# ==========================================
+
+def collect_pending(works):
+    episodes = []
+    for work in works:
+        toc = get_toc(work['url'])
+        if not os.path.exists(work['history_file']): seed_history(work)
+        done = load_history(work['history_file'])
+        chain = store.merge_episode_chain(work['url'], toc['episodes'])
+        pending = [e for e in chain if e['link'] not in done]
+        print(f"📑 {work['url']}: ค้าง {len(pending)}/{len(chain)} ตอน")
+
+        def fetch(ep):
+            data = get_content_and_next_link(ep['link'], work['url'])
+            return ep, data
+
+        with ThreadPoolExecutor(max_workers=max(1, FETCH_WORKERS)) as pool:
+            for ep, data in pool.map(fetch, pending):
+                if not data:
+                    print(f"   ❌ ดึงเนื้อหาไม่ได้: {ep['link']}"); continue
+                episodes.append({"work": work['url'], "history_file": work['history_file'],
+                                 "work_title": toc['title'], "ep_id": data['ep_id'], "link": ep['link'],
+                                 "title": data['title'], "content": data['content']})
+    return episodes
+
+
+# ==========================================
+# 2) สร้างไฟล์คำขอ + ส่งงาน
+# ==========================================
+
+def build_requests(episodes):
+    # key -> {text, strategy, novel} เฉพาะที่ยังไม่มีในแคช (ซ้ำกันก็ส่งครั้งเดียว)
+    items, seen = {}, set()
+
+    def add(key, text, strategy, novel):
+        if not text or (text, strategy) in seen or cache.get_any(text, router.models, strategy): return
+        seen.add((text, strategy))
+        items[key] = {"text": text, "strategy": strategy, "novel": novel}
+
+    for ep in episodes:
+        wid = work_id_of(ep['work'])
+        add(f"{wid}/work/title", ep['work_title'], "title", ep['work'])
+        add(f"{wid}/{ep['ep_id']}/title", ep['title'], "title", ep['work'])
+        for i, chunk in enumerate(split_chunks(ep['content'])):
+            add(f"{wid}/{ep['ep_id']}/c{i}", chunk, "normal", ep['work'])
+    return items
+
+
+def request_line(key, item):
+    prompt = TITLE_PROMPT.format(text=item['text']) if item['strategy'] == "title" else PROMPTS[item['strategy']] + item['text']
+    request = {
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        "safety_settings": SAFETY_SETTINGS,
+    }
+    # 📖 ก้อนเนื้อหาแนบอภิธานศัพท์ (เฉพาะคำที่อยู่ในก้อน) เหมือนโหมด interactive
+    instruction = glossary.instruction_for(item['novel'], item['text']) if item['strategy'] != "title" else None
+    if instruction: request["system_instruction"] = {"parts": [{"text": instruction}]}
+    return json.dumps({"key": key, "request": request}, ensure_ascii=False)
+
+
+def submit(items):
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    path = os.path.join(BATCH_DIR, f"requests-{int(time.time())}.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for key, item in items.items(): f.write(request_line(key, item) + "\n")
+
+    with report.stage("batch_submit", requests=len(items)):
+        uploaded = client.files.upload(file=path, config=types.UploadFileConfig(
+            display_name=os.path.basename(path), mime_type="jsonl"))
+        job = client.batches.create(model=BATCH_MODEL, src=uploaded.name,
+                                    config={"display_name": f"novel-backfill-{int(time.time())}"})
+    print(f"📤 ส่ง batch job {job.name} ({len(items)} คำขอ)")
+    return job.name
+
+
+# ==========================================
+# 3) รอผล + แกะผล
+# ==========================================
+
+def wait_for(job_name, max_wait_minutes):
+    deadline = time.monotonic() + max_wait_minutes * 60
+    with report.stage("batch_wait", job=job_name) as ev:
+        while True:
+            job = client.batches.get(name=job_name)
+            state = job.state.name if hasattr(job.state, "name") else str(job.state)
+            ev["state"] = state
+            if state in DONE_STATES: return job, state
+            if time.monotonic() + POLL_SECONDS > deadline: return None, state
+            print(f"   ⏳ batch {state} -> เช็คใหม่ใน {POLL_SECONDS:.0f} วิ")
+            time.sleep(POLL_SECONDS)
+
+
+def response_text(response):
+    # {"candidates": [{"content": {"parts": [{"text": ...}]}, "finishReason": ...}]} -> ข้อความ (โดนบล็อก = None)
+    for cand in (response or {}).get("candidates") or []:
+        parts = (cand.get("content") or {}).get("parts") or []
+        text = "".join(p.get("text", "") for p in parts)
+        if text.strip(): return text
+    return None
+
+
+def parse_results(raw):
+    results = {}
+    for line in raw.decode("utf-8").splitlines():
+        if not line.strip(): continue
+        row = json.loads(line)
+        text = None if row.get("error") else response_text(row.get("response"))
+        if text: results[row["key"]] = text
+    return results
+
+
+# ==========================================
+# 4) บันทึกลงคลัง (ก้อนที่พังเท่านั้นที่ไปทาง interactive)
+# ==========================================
+
+def apply(state, results):
+    ok = rejected = 0
+    for key, item in state['items'].items():
+        text = results.get(key)
+        if not text: continue
+        if item['strategy'] == "title": text = text.strip().replace('"', '')
+        # 🧭 ตรวจคุณภาพแบบเดียวกับ router -> ไม่ผ่านไม่ใส่แคช ให้ไปแปลใหม่ด้วยชั้นถัดไป
+        problem = quality_problem(item['text'], text, item['strategy'])
+        if problem:
+            rejected += 1; continue
+        cache.put(item['text'], state.get('model', BATCH_MODEL), item['strategy'], text, item['novel'])
+        ok += 1
+    print(f"📥 ผล batch สำเร็จ {ok}/{len(state['items'])} คำขอ (ไม่ผ่านตรวจ {rejected}) -> ที่เหลือแปลแบบ interactive")
+    report.record("batch_results", ok=ok, rejected=rejected, failed=len(state['items']) - ok)
+
+    by_work = {}
+    for ep in state['episodes']: by_work.setdefault(ep['work'], []).append(ep)
+    for work_url, eps in by_work.items():
+        titles = {ep['ep_id']: ep['title'] for ep in eps}
+        if eps[0]['work_title']: titles["work"] = eps[0]['work_title']
+        thai_titles = translator.translate_titles(titles, work_url)
+        novel_title = thai_titles.get("work") or store.title(work_url) or "นิยายไม่ทราบชื่อ"
+        for ep in sorted(eps, key=lambda e: int(e['ep_id'])):
+            content, segments, err = translator.translate_segments(ep['content'], work_url)
+            if not content:
+                print(f"   ❌ {ep['link']}: {err}"); continue
+            save_to_json(work_url, novel_title, {"ep_id": ep['ep_id'], "title": thai_titles.get(ep['ep_id'], ep['title']),
+                                                 "content": content, "link": ep['link'],
+                                                 "source_hash": source_hash(ep['content']), "segments": segments})
+            if is_failed(content): print("   ⚠️ ติด Safety -> ไม่บันทึกประวัติ (รอรันใหม่)")
+            else: save_to_history(ep['history_file'], ep['link'])
+
+
+# ==========================================
+# 🚀 Main
+# ==========================================
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Backfill pending episodes through one Gemini batch job")
+    p.add_argument("--no-wait", action="store_true", help="ส่ง/เช็คงานครั้งเดียวแล้วจบ")
+    p.add_argument("--max-wait-minutes", type=float, default=MAX_WAIT_MINUTES)
+    args = p.parse_args(argv)
+
+    if not client:
+        print("❌ ไม่มี GEMINI_API_KEY"); return
+    print("📦 เริ่มโหมด Batch...")
+
+    state = read_json(STATE_FILE)
+    if not state:
+        episodes = collect_pending(load_works())
+        if not episodes:
+            print("✅ ไม่มีตอนค้าง"); return
+        items = build_requests(episodes)
+        state = {"job": submit(items) if items else None, "model": BATCH_MODEL, "items": items, "episodes": episodes}
+        atomic_write_json(STATE_FILE, state)
+    else:
+        print(f"🔁 มีงานค้างจากรอบก่อน: {state['job']} ({len(state['episodes'])} ตอน)")
+
+    results = {}
+    if state['job']:
+        job, status = wait_for(state['job'], 0 if args.no_wait else args.max_wait_minutes)
+        if not job:
+            print(f"⏳ batch ยังไม่เสร็จ ({status}) -> รันใหม่ภายหลังเพื่อเก็บผล"); return
+        print(f"🏁 batch จบแล้ว: {status}")
+        if job.dest and job.dest.file_name:
+            results = parse_results(client.files.download(file=job.dest.file_name))
+
+    apply(state, results)
+    os.remove(STATE_FILE)
+    store.export_json()
+    report_summaries(translator)
+    report.write("batch_translate")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import os
+import re
+import sys
+import time
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import kakuyomu
+
+# ==========================================
+# ⏱️ Micro-benchmark: ตัวแกะหน้าเว็บเดิม (BeautifulSoup ทั้งต้น) vs kakuyomu.py
+# ==========================================
+# python bench/extract.py [จำนวนรอบ]
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "kakuyomu")
+WORK_URL = "https://kakuyomu.jp/works/1177354054800000000"
+EPISODE_URL = WORK_URL + "/episodes/1177354054800002000"
+
+
+# ---------- โค้ดเดิมจาก check_novel.py / translate_all.py ----------
+
+def legacy_episode(html, url):
+    s = BeautifulSoup(html, 'html.parser')
+    t = s.select_one('.widget-episodeTitle').text.strip()
+    b = s.select_one('.widget-episodeBody').get_text(separator="\n", strip=True)
+    n = s.select_one('a.widget-episode-navigation-next') or s.select_one('a#contentMain-readNextEpisode') or s.find('a', string=re.compile('次のエピソード'))
+    return {"title": t, "content": b, "next_link": urljoin(url, n['href']) if n else None}
+
+
+def legacy_toc(html, url):
+    s = BeautifulSoup(html, 'html.parser')
+    title_elem = s.select_one('#workTitle') or s.select_one('h1')
+    links = s.find_all('a', href=re.compile(r'/works/\d+/episodes/(\d+)'))
+    return title_elem.text.strip(), [urljoin(url, a['href']) for a in links]
+
+
+def bench(name, fn, *args, rounds=20):
+    fn(*args)
+    start = time.perf_counter()
+    for _ in range(rounds): fn(*args)
+    ms = (time.perf_counter() - start) / rounds * 1000
+    print(f"   {name:<28} {ms:8.2f} ms/หน้า")
+    return ms
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with open(os.path.join(FIXTURES, "episode.html"), encoding="utf-8") as f: episode = f.read()
+    with open(os.path.join(FIXTURES, "work_toc.html"), encoding="utf-8") as f: toc = f.read()
+
+    # ผลลัพธ์ต้องตรงกับของเดิมก่อนจะวัดความเร็ว
+    old, new = legacy_episode(episode, EPISODE_URL), kakuyomu.parse_episode(episode, EPISODE_URL)
+    assert all(old[k] == new[k] for k in old), "parse_episode ให้ผลต่างจากของเดิม"
+    assert [e["link"] for e in kakuyomu.parse_toc(toc, WORK_URL)["episodes"]] == sorted(set(legacy_toc(toc, WORK_URL)[1]), key=lambda l: int(l.rsplit("/", 1)[1]))
+
+    print(f"🔎 backend: {kakuyomu.BACKEND} | {rounds} รอบ")
+    for label, legacy, fast, html, url in (
+        ("หน้าตอน", legacy_episode, kakuyomu.parse_episode, episode, EPISODE_URL),
+        ("หน้าสารบัญ", legacy_toc, kakuyomu.parse_toc, toc, WORK_URL),
+    ):
+        print(f"📄 {label} ({len(html) / 1024:.0f} KB)")
+        a = bench("BeautifulSoup (เดิม)", legacy, html, url, rounds=rounds)
+        b = bench(f"kakuyomu.py ({kakuyomu.BACKEND})", fast, html, url, rounds=rounds)
+        print(f"   ⚡ เร็วขึ้น {a / b:.1f} เท่า")
+
+
+if __name__ == "__main__":
+    main()
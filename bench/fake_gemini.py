@@ -0,0 +1,182 @@
+import json
+import random
+import re
+import threading
+import time
+
+# ==========================================
+# 🤖 Gemini ปลอมสำหรับ benchmark (ไม่ใช้โควตาจริง)
+# ==========================================
+# หน้าตาเหมือน genai.Client: client.models.generate_content(model=, contents=, config=)
+# ตั้งค่า latency / อัตรา 429 / อัตราโดน safety block / อัตราคำเกริ่นหลุดมาจากโมเดล flash ได้
+# มี client.files / client.batches ปลอมด้วย (Batch API)
+
+JAPANESE = re.compile(r'[぀-ヿ㐀-䶿一-鿿々〆]')
+PREAMBLE = "เยี่ยมเลย! จัดไปแบบวัยรุ่นๆ ตามที่ขอเลยครับ:\n\n"
+
+
+def fake_thai(text):
+    # "แปล" โดยแทนตัวอักษรญี่ปุ่นด้วยอักษรไทย -> ยาวพอๆ ต้นฉบับ บรรทัด/ย่อหน้าตรงกัน (ผ่านตรวจคุณภาพของ router)
+    return JAPANESE.sub("ก", text)
+
+
+class FakeUsage:
+    def __init__(self, prompt_tokens, output_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+        self.cached_content_token_count = 0
+
+
+class FakeResponse:
+    def __init__(self, text, prompt):
+        self.text = text
+        self.usage_metadata = FakeUsage(len(prompt), len(text or ""))
+
+
+class FakeModels:
+    def __init__(self, latency=0.5, jitter=0.2, rate_429=0.0, block_rate=0.0, retry_delay=0.5, preamble_rate=0.0, seed=1):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.block_rate = block_rate
+        self.retry_delay = retry_delay
+        self.preamble_rate = preamble_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "429": 0, "blocked": 0, "preamble": 0, "prompt_tokens": 0, "output_tokens": 0}
+
+    def _roll(self):
+        with self._lock:
+            self.stats["calls"] += 1
+            return self._rng.random(), self._rng.random(), self._rng.uniform(-self.jitter, self.jitter), self._rng.random()
+
+    def generate_content(self, model, contents, config=None):
+        r429, rblock, jitter, rpre = self._roll()
+        time.sleep(max(0.0, self.latency + jitter))
+        if r429 < self.rate_429:
+            with self._lock: self.stats["429"] += 1
+            raise Exception(f"429 RESOURCE_EXHAUSTED. {{'error': {{'details': [{{'retryDelay': '{self.retry_delay}s'}}]}}}}")
+
+        # คำขอแปลชื่อแบบรวม (JSON) -> ตอบทุก id
+        if getattr(config, "response_mime_type", None) == "application/json":
+            # คำขออัปเดตอภิธานศัพท์ -> ตอบทุกคำ
+            m = re.search(r'Terms: (\[.*?\])\n', contents)
+            if m:
+                text = json.dumps([{"jp": t, "thai": f"ศัพท์ {t}"} for t in json.loads(m.group(1))], ensure_ascii=False)
+                return self._ok(text, contents)
+            m = re.search(r'\[.*\]', contents, re.S)
+            items = json.loads(m.group(0)) if m else []
+            text = json.dumps([{"id": i["id"], "thai": f"ชื่อแปล {fake_thai(i['text'])}"} for i in items], ensure_ascii=False)
+            return self._ok(text, contents)
+
+        # โดน safety block -> ไม่มีข้อความตอบกลับ (เฉพาะ prompt แปลปกติ ให้ Soften/Summary ผ่านได้)
+        if rblock < self.block_rate and "Soft" not in contents and "สรุป" not in contents:
+            with self._lock: self.stats["blocked"] += 1
+            return FakeResponse(None, contents)
+
+        if "Translate this" in contents:
+            return self._ok(f"ชื่อแปล {fake_thai(contents.strip().splitlines()[-1])}", contents)
+        body = fake_thai(contents.split("\n", 1)[-1])
+        # โมเดลเล็กบางทีพูดเกริ่นก่อนคำแปล -> router ต้องยกไปโมเดลใหญ่
+        if rpre < self.preamble_rate and "flash" in model:
+            with self._lock: self.stats["preamble"] += 1
+            body = PREAMBLE + body
+        return self._ok(body, contents)
+
+    def _ok(self, text, prompt):
+        res = FakeResponse(text, prompt)
+        with self._lock:
+            self.stats["prompt_tokens"] += res.usage_metadata.prompt_token_count
+            self.stats["output_tokens"] += res.usage_metadata.candidates_token_count
+        return res
+
+
+class FakeGenaiClient:
+    # ใช้แทน genai.Client(api_key=...) ตัวเลือกอ่านจาก FakeGenaiClient.options
+    options = {}
+    instances = []
+
+    def __init__(self, api_key=None, **kwargs):
+        options = dict(self.options)
+        polls = options.pop("batch_polls", 1)
+        self.models = FakeModels(**options)
+        self.files = FakeFiles()
+        self.batches = FakeBatches(self.files, self.models, polls)
+        FakeGenaiClient.instances.append(self)
+
+
+# ==========================================
+# 📦 Batch API ปลอม (client.files / client.batches) สำหรับ batch_translate.py
+# ==========================================
+
+class FakeFile:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeFiles:
+    def __init__(self):
+        self.blobs = {}
+
+    def upload(self, file, config=None):
+        name = f"files/{len(self.blobs) + 1}"
+        with open(file, "rb") as f: self.blobs[name] = f.read()
+        return FakeFile(name)
+
+    def download(self, file, config=None):
+        return self.blobs[getattr(file, "name", file)]
+
+
+class FakeJobState:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeBatchJob:
+    def __init__(self, name, state, file_name=None):
+        self.name = name
+        self.state = FakeJobState(state)
+        self.dest = FakeFile(file_name) if file_name else None
+        if self.dest: self.dest.file_name = file_name
+
+
+class FakeBatches:
+    # งานเสร็จหลังถูกเช็คสถานะครบ polls ครั้ง แต่ละบรรทัดโดนบล็อกตาม block_rate ของ FakeModels
+    def __init__(self, files, models, polls=1):
+        self.files = files
+        self.models = models
+        self.polls = polls
+        self.jobs = {}
+        self.stats = {"jobs": 0, "requests": 0, "blocked": 0}
+
+    def create(self, model, src, config=None):
+        name = f"batches/{len(self.jobs) + 1}"
+        self.jobs[name] = {"src": src, "polls": 0, "result": None}
+        self.stats["jobs"] += 1
+        return FakeBatchJob(name, "JOB_STATE_PENDING")
+
+    def get(self, name):
+        job = self.jobs[name]
+        job["polls"] += 1
+        if job["polls"] < self.polls: return FakeBatchJob(name, "JOB_STATE_RUNNING")
+        if not job["result"]: job["result"] = self._run(job["src"])
+        return FakeBatchJob(name, "JOB_STATE_SUCCEEDED", job["result"])
+
+    def _run(self, src):
+        out = []
+        for line in self.files.blobs[src].decode("utf-8").splitlines():
+            row = json.loads(line)
+            prompt = row["request"]["contents"][0]["parts"][0]["text"]
+            self.stats["requests"] += 1
+            if self.models._rng.random() < self.models.block_rate and "Translate this" not in prompt:
+                self.stats["blocked"] += 1
+                response = {"candidates": [{"finishReason": "SAFETY"}]}
+            else:
+                text = f"ชื่อแปล {fake_thai(prompt.strip().splitlines()[-1])}" if "Translate this" in prompt \
+                    else fake_thai(prompt.split("\n", 1)[-1])
+                response = {"candidates": [{"content": {"parts": [{"text": text}]}, "finishReason": "STOP"}]}
+            out.append(json.dumps({"key": row["key"], "response": response}, ensure_ascii=False))
+        name = f"files/result-{len(self.files.blobs) + 1}"
+        self.files.blobs[name] = "\n".join(out).encode("utf-8")
+        return name
@@ -0,0 +1,215 @@
+import argparse
+import importlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# ==========================================
+# 🧪 Benchmark แบบออฟไลน์: หน้าเว็บจาก fixtures + Gemini ปลอม
+# ==========================================
+# python bench/offline.py                         -> วัด check_novel / translate_all / batch_translate
+# python bench/offline.py --target translate_all --episodes 40 --latency 1.0 --rate-429 0.1
+# python bench/offline.py --json out.json         -> เก็บผลไว้เทียบ
+# python bench/offline.py --baseline out.json     -> ช้าลง/เรียก API มากขึ้นเกิน --tolerance = exit 1
+#
+# แต่ละ target รันใน process ใหม่ + โฟลเดอร์ชั่วคราว (data/, novels.json, แคช ไม่ปนของจริง)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES = os.path.join(BENCH_DIR, "fixtures", "kakuyomu")
+FIXTURE_WORK_ID = "1177354054800000000"
+TARGETS = ["check_novel", "translate_all", "batch_translate"]
+RESULT_TAG = "BENCH_RESULT "
+
+
+# ==========================================
+# 🌐 kakuyomu ปลอม: เล่นหน้า fixtures ซ้ำผ่าน scraper.get เดิม
+# ==========================================
+
+class FakeHTTPResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.status_code = status_code
+        self.headers = {}
+
+
+class FixtureScraper:
+    def __init__(self, episodes, latency):
+        with open(os.path.join(FIXTURES, "work_toc.html"), encoding="utf-8") as f: toc = f.read()
+        with open(os.path.join(FIXTURES, "episode.html"), encoding="utf-8") as f: self.episode = f.read()
+        # ตัดสารบัญเหลือ N ตอนแรก
+        items = re.findall(r'<div class="WorkTocSection_item">.*?</a></div>', toc)
+        for item in items[episodes:]: toc = toc.replace(item, "")
+        self.toc = toc
+        self.ep_ids = re.findall(r'/episodes/(\d+)"><div class="WorkTocSection_title"', toc)
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        with self._lock: self.requests += 1
+        time.sleep(self.latency)
+        m = re.search(r'/works/(\d+)(?:/episodes/(\d+))?', url)
+        if not m: return FakeHTTPResponse("", 404)
+        work_id, ep_id = m.groups()
+        if not ep_id: return FakeHTTPResponse(self.toc.replace(FIXTURE_WORK_ID, work_id))
+        if ep_id not in self.ep_ids: return FakeHTTPResponse("", 404)
+
+        idx = self.ep_ids.index(ep_id)
+        html = self.episode.replace(FIXTURE_WORK_ID, work_id)
+        # ใส่เลขตอนลงทุกย่อหน้า -> เนื้อหาไม่ซ้ำกัน (ไม่งั้นแคชคำแปลจะตอบแทนหมด)
+        html = re.sub(r'(<p id="p\d+">)', rf'\g<1>{idx + 1}:', html)
+        html = re.sub(r'第\d+話', f'第{idx + 1}話', html, count=1)
+        nxt = re.search(r'<li><a id="contentMain-readNextEpisode".*?</li>', html).group(0)
+        if idx + 1 < len(self.ep_ids):
+            html = html.replace(nxt, re.sub(r'episodes/\d+', f'episodes/{self.ep_ids[idx + 1]}', nxt))
+        else:
+            html = html.replace(nxt, "")
+        return FakeHTTPResponse(html)
+
+
+# ==========================================
+# 🏃 process ลูก: สลับ genai.Client / cloudscraper แล้วรัน main() ของสคริปต์จริง
+# ==========================================
+
+def run_child(target, args):
+    os.environ.update({
+        "GEMINI_API_KEY": "offline-bench",
+        "KAKUYOMU_INTERVAL": str(args.fetch_interval),
+        "GEMINI_RPM": str(args.rpm),
+        "BATCH_POLL_SECONDS": "0.1",
+    })
+    sys.path.insert(0, REPO_DIR)
+    sys.path.insert(0, BENCH_DIR)
+
+    from fake_gemini import FakeGenaiClient
+    from google import genai
+    import cloudscraper
+
+    FakeGenaiClient.options = dict(latency=args.latency, jitter=args.latency / 4, rate_429=args.rate_429,
+                                   block_rate=args.block_rate, retry_delay=args.retry_delay, preamble_rate=args.preamble_rate)
+    genai.Client = FakeGenaiClient
+    scraper = FixtureScraper(args.episodes, args.fetch_latency)
+    cloudscraper.create_scraper = lambda *a, **k: scraper
+
+    mod = importlib.import_module(target)
+    sys.argv = [target + ".py"]
+    start = time.perf_counter()
+    mod.main()
+    wall = time.perf_counter() - start
+
+    episodes = sum(len(mod.store.chapters(url)) for url in mod.store.novel_urls())
+    api = {}
+    for client in FakeGenaiClient.instances:
+        for k, v in client.models.stats.items(): api[k] = api.get(k, 0) + v
+        for k, v in client.batches.stats.items(): api["batch_" + k] = api.get("batch_" + k, 0) + v
+    gemini = getattr(mod, "gemini", None)
+    result = {
+        "target": target,
+        "episodes": episodes,
+        "wall_seconds": round(wall, 2),
+        "episodes_per_minute": round(episodes / wall * 60, 2) if wall else 0,
+        "api_calls": api.get("calls", 0),
+        "api_calls_per_episode": round(api.get("calls", 0) / episodes, 2) if episodes else None,
+        "injected_429": api.get("429", 0),
+        "injected_blocks": api.get("blocked", 0) + api.get("batch_blocked", 0),
+        "injected_preambles": api.get("preamble", 0),
+        "batch_requests": api.get("batch_requests", 0),
+        "prompt_tokens": api.get("prompt_tokens", 0),
+        "output_tokens": api.get("output_tokens", 0),
+        "page_fetches": scraper.requests,
+        "throttled_seconds": round(getattr(gemini, "throttled_seconds", 0), 2),
+        "backoff_seconds": round(getattr(gemini, "backoff_seconds", 0), 2),
+    }
+    print(RESULT_TAG + json.dumps(result))
+
+
+def run_target(target, args):
+    workdir = tempfile.mkdtemp(prefix=f"bench-{target}-")
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", target] + args.passthrough
+    results = []
+    for i in range(args.repeat):
+        # รอบที่ 2 เป็นต้นไปใช้โฟลเดอร์เดิม -> วัดการรันซ้ำ (แคช/ประวัติ/สารบัญที่เก็บไว้)
+        proc = subprocess.run(cmd, cwd=workdir, capture_output=True, text=True)
+        if args.verbose: print(proc.stdout)
+        line = next((l for l in proc.stdout.splitlines() if l.startswith(RESULT_TAG)), None)
+        if proc.returncode != 0 or not line:
+            print(proc.stdout[-2000:], proc.stderr[-4000:], sep="\n")
+            raise SystemExit(f"❌ {target} รันไม่สำเร็จ")
+        result = json.loads(line[len(RESULT_TAG):])
+        result["run"] = i + 1
+        results.append(result)
+    return results
+
+
+def print_table(results):
+    cols = [("target", 16), ("run", 4), ("episodes", 9), ("wall_seconds", 13), ("episodes_per_minute", 20),
+            ("api_calls_per_episode", 22), ("injected_429", 13), ("injected_blocks", 16), ("page_fetches", 13)]
+    print("".join(name.ljust(w) for name, w in cols))
+    for r in results:
+        print("".join(str(r.get(name)).ljust(w) for name, w in cols))
+
+
+def check_baseline(results, path, tolerance):
+    with open(path, encoding="utf-8") as f: baseline = {(r["target"], r["run"]): r for r in json.load(f)}
+    failed = False
+    for r in results:
+        base = baseline.get((r["target"], r["run"]))
+        if not base: continue
+        if r["episodes_per_minute"] < base["episodes_per_minute"] * (1 - tolerance):
+            print(f"🔻 {r['target']} #{r['run']}: ep/min {base['episodes_per_minute']} -> {r['episodes_per_minute']}")
+            failed = True
+        if (r["api_calls_per_episode"] or 0) > (base["api_calls_per_episode"] or 0) * (1 + tolerance):
+            print(f"🔻 {r['target']} #{r['run']}: calls/ep {base['api_calls_per_episode']} -> {r['api_calls_per_episode']}")
+            failed = True
+    return not failed
+
+
+def main():
+    p = argparse.ArgumentParser(description="Offline benchmark for check_novel.py / translate_all.py")
+    p.add_argument("--target", choices=TARGETS + ["all"], default="all")
+    p.add_argument("--episodes", type=int, default=30, help="จำนวนตอนในสารบัญปลอม")
+    p.add_argument("--latency", type=float, default=0.3, help="latency ต่อคำขอ Gemini (วินาที)")
+    p.add_argument("--rate-429", type=float, default=0.0)
+    p.add_argument("--block-rate", type=float, default=0.0)
+    p.add_argument("--preamble-rate", type=float, default=0.0, help="อัตราที่โมเดล flash ตอบคำเกริ่นนำหน้าคำแปล")
+    p.add_argument("--retry-delay", type=float, default=0.2, help="retryDelay ที่ 429 ปลอมบอกกลับมา")
+    p.add_argument("--fetch-latency", type=float, default=0.05, help="latency ต่อหน้าเว็บ (วินาที)")
+    p.add_argument("--fetch-interval", type=float, default=0.0, help="KAKUYOMU_INTERVAL ระหว่างวัด")
+    p.add_argument("--rpm", type=float, default=1000)
+    p.add_argument("--repeat", type=int, default=1)
+    p.add_argument("--json")
+    p.add_argument("--baseline")
+    p.add_argument("--tolerance", type=float, default=0.2)
+    p.add_argument("--verbose", action="store_true")
+    p.add_argument("--child", choices=TARGETS, help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.child:
+        run_child(args.child, args); return
+
+    args.passthrough = [a for a in sys.argv[1:] if a not in ("--verbose",)]
+    for flag in ("--json", "--baseline", "--target", "--repeat"):
+        if flag in args.passthrough:
+            i = args.passthrough.index(flag); del args.passthrough[i:i + 2]
+
+    results = []
+    for target in (TARGETS if args.target == "all" else [args.target]):
+        print(f"🧪 {target} ...")
+        results += run_target(target, args)
+    print_table(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(results, f, ensure_ascii=False, indent=4)
+    if args.baseline and not check_baseline(results, args.baseline, args.tolerance):
+        raise SystemExit("❌ ช้ากว่า baseline เกินที่กำหนด")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import gzip
+import json
+import os
+import sys
+from novel_store import NovelStore, work_id_of
+from search_index import SearchIndex
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ==========================================
+# 🏗️ สร้างไฟล์หน้าเว็บแบบแบ่งก้อน (รันต่อจาก check_novel.py / translate_all.py)
+# ==========================================
+# site/manifest.json                     -> ชื่อเรื่อง + สารบัญ (ไม่มีเนื้อหา) โหลดตอนเปิดเว็บ
+# site/chapters/<work_id>/<ep_id>.json   -> เนื้อหาทีละตอน (+ .gz / .br บีบอัดไว้ล่วงหน้า)
+# site/search/<work_id>/                 -> ดัชนีค้นหา n-gram แยกเรื่อง แยกถัง (search_index.py)
+#
+# index.html โหลดแค่ manifest แล้วดึงเฉพาะตอนที่เปิดอ่าน (และ prefetch ตอนถัดไป)
+
+SITE_DIR = "site"
+
+
+def _dump(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def write_if_changed(path, raw):
+    # เขียนเฉพาะไฟล์ที่เนื้อหาเปลี่ยน -> build ซ้ำเร็ว และ commit มีแต่ตอนที่อัปเดตจริง
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            if f.read() == raw: return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f: f.write(raw)
+    os.replace(tmp, path)
+    return True
+
+
+def write_compressed(path, raw):
+    changed = write_if_changed(path, raw)
+    if changed or not os.path.exists(path + ".gz"):
+        # mtime=0 -> ไฟล์ .gz เหมือนเดิมทุกครั้งถ้าเนื้อหาไม่เปลี่ยน (ไม่สร้าง diff ปลอม)
+        write_if_changed(path + ".gz", gzip.compress(raw, compresslevel=9, mtime=0))
+    if brotli and (changed or not os.path.exists(path + ".br")):
+        write_if_changed(path + ".br", brotli.compress(raw, quality=11))
+    return changed
+
+
+def build(store=None, out_dir=SITE_DIR):
+    store = store or NovelStore()
+    manifest = {"novels": []}
+    written = total = indexed = 0
+    expected = set()
+    search = SearchIndex(out_dir, write_compressed)
+
+    for novel_url in store.novel_urls():
+        work_id = work_id_of(novel_url)
+        chapters = sorted(store.chapters(novel_url), key=lambda c: int(c["ep_id"]))
+        manifest["novels"].append({
+            "id": novel_url,
+            "work_id": work_id,
+            "title": store.title(novel_url),
+            "chapters": [{"ep_id": c["ep_id"], "title": c["title"], "link": c["link"]} for c in chapters],
+        })
+        docs = {}
+        for meta in chapters:
+            ep = store.get_chapter(novel_url, meta["link"]) or {}
+            docs[meta["ep_id"]] = f"{meta['title']}\n{ep.get('content', '')}"
+            path = os.path.join(out_dir, "chapters", work_id, f"{meta['ep_id']}.json")
+            expected.add(path)
+            raw = _dump({"ep_id": meta["ep_id"], "title": meta["title"],
+                         "content": ep.get("content", ""), "link": meta["link"]})
+            written += write_compressed(path, raw)
+            total += 1
+        indexed += search.update_novel(work_id, docs)
+
+    write_compressed(os.path.join(out_dir, "manifest.json"), _dump(manifest))
+
+    # ลบไฟล์ตอนที่ไม่มีในคลังแล้ว
+    removed = 0
+    chapters_dir = os.path.join(out_dir, "chapters")
+    for root, _, files in os.walk(chapters_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            base = path[:-3] if name.endswith((".gz", ".br")) else path
+            if base not in expected:
+                os.remove(path); removed += 1
+
+    print(f"🏗️ สร้างเว็บแล้ว: {len(manifest['novels'])} เรื่อง | {total} ตอน (เขียนใหม่ {written}, ลบ {removed} ไฟล์)"
+          + f" | ดัชนีค้นหาอัปเดต {indexed} ตอน"
+          + ("" if brotli else " | ไม่มี brotli -> สร้างแค่ .gz"))
+
+
+if __name__ == "__main__":
+    build(out_dir=sys.argv[1] if len(sys.argv) > 1 else SITE_DIR)
@@ -1,21 +1,34 @@
-from google import genai
-from google.genai import types
-import cloudscraper
-import requests
-from bs4 import BeautifulSoup
 import time
+STARTED = time.perf_counter()   # ⚡ วัด cold start (import + ตั้งค่า) ตั้งแต่บรรทัดแรก
 import os
 import re
-import random
-import json
-from urllib.parse import urljoin
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from rate_limit import HostLimiter, ConcurrencyCap
+from kakuyomu import parse_episode, parse_toc
+from novel_store import NovelStore
+from segments import is_failed, source_hash, align_segments
+from run_report import report
+from notifier import DiscordNotifier
 
 # ==========================================
 # ⚙️ ส่วนตั้งค่า
 # ==========================================
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") 
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", 'gemini-2.5-pro')   # ชั้น strong (ชั้น fast = GEMINI_FAST_MODEL ใน model_router.py)
 JSON_DB_FILE = "novels.json"
 
+# 🧵 โหมดเช็คหลายเรื่องพร้อมกัน
+NOVEL_WORKERS = int(os.getenv("NOVEL_WORKERS", "4"))            # จำนวนเรื่องที่ทำพร้อมกัน
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "2"))  # เรียก Gemini พร้อมกันได้สูงสุด
+KAKUYOMU_INTERVAL = float(os.getenv("KAKUYOMU_INTERVAL", "2"))  # เว้นระยะต่อ request ไป kakuyomu (วินาที)
+MAX_CATCHUP = int(os.getenv("MAX_CATCHUP", "20"))               # ตามตอนที่พลาดได้สูงสุดต่อเรื่องต่อรอบ
+RECHECK_PER_RUN = int(os.getenv("RECHECK_PER_RUN", "3"))        # เช็คตอนเก่าว่าผู้แต่งแก้ต้นฉบับไหม (ต่อเรื่องต่อรอบ)
+RECHECK_DAYS = float(os.getenv("RECHECK_DAYS", "7"))            # ตอนเดียวกันเช็คซ้ำห่างกันอย่างน้อยกี่วัน
+RETRY_FAILED_PER_RUN = int(os.getenv("RETRY_FAILED_PER_RUN", "1"))  # ตอนเก่าที่ติด safety ลองแปลใหม่ต่อเรื่องต่อรอบ (แยกจาก MAX_CATCHUP)
+RETRY_FAILED_DAYS = float(os.getenv("RETRY_FAILED_DAYS", "1"))      # ติดซ้ำ -> รอ 1, 2, 4, ... วัน (สูงสุด 32 เท่า) ก่อนลองอีก
+
 # 🟢 รายชื่อนิยาย
 NOVEL_LIST = [
     {
@@ -38,121 +51,82 @@ NOVEL_LIST = [
     }
 ]
 
-if GEMINI_API_KEY:
-    try:
-        client = genai.Client(api_key=GEMINI_API_KEY)
-    except Exception as e:
-        print(f"❌ Client Error: {e}"); client = None
-else:
-    client = None
+# 🚦 ตัวคุมจังหวะที่ทุก thread ใช้ร่วมกัน
+kakuyomu_limiter = HostLimiter(KAKUYOMU_INTERVAL)
+gemini_cap = ConcurrencyCap(GEMINI_CONCURRENCY)
+store = NovelStore(legacy_json=JSON_DB_FILE)
+notifier = DiscordNotifier()
 
-scraper = cloudscraper.create_scraper(
-    browser={'browser': 'chrome', 'platform': 'windows', 'desktop': True}
-)
+# ==========================================
+# ⚡ โหลดของหนักเมื่อจำเป็นเท่านั้น
+# ==========================================
+# รอบส่วนใหญ่ไม่มีตอนใหม่ -> ไม่ต้อง import google.genai (~1 วินาที) / เปิดแคชคำแปล / สร้าง Gemini client
+# get_translator() ถูกเรียกครั้งแรกเมื่อเจอตอนใหม่หรือต้นฉบับถูกแก้จริงๆ (thread แรกโหลด ที่เหลือรอ)
+scraper = client = gemini = cache = translator = None
+_scraper_lock = threading.Lock()
+_translator_lock = threading.Lock()
+
+def get_scraper():
+    global scraper
+    with _scraper_lock:
+        if scraper is None:
+            start = time.perf_counter()
+            import cloudscraper
+            scraper = cloudscraper.create_scraper(
+                browser={'browser': 'chrome', 'platform': 'windows', 'desktop': True}
+            )
+            report.record("cold_start", time.perf_counter() - start, part="scraper")
+        return scraper
+
+def get_translator():
+    global client, gemini, cache, translator
+    with _translator_lock:
+        if translator is not None: return translator
+        start = time.perf_counter()
+        from google import genai
+        from translation_cache import TranslationCache
+        from translator import build_translator
+
+        if GEMINI_API_KEY:
+            try:
+                client = genai.Client(api_key=GEMINI_API_KEY)
+            except Exception as e:
+                print(f"❌ Client Error: {e}"); client = None
+
+        # ตัวแปลกลางอยู่ใน translator.py (หั่นตอนยาวเป็นก้อนตามย่อหน้า + ส่งพร้อมกัน + แคช)
+        cache = TranslationCache()
+        translator = build_translator(client, store, GEMINI_MODEL, cache, cap=gemini_cap)
+        gemini = translator.client
+        seconds = time.perf_counter() - start
+        report.record("cold_start", seconds, part="translator")
+        print(f"🧠 โหลดระบบแปลแล้ว ({seconds:.2f} วินาที)")
+        return translator
 
 # ==========================================
 # 🛠️ ฟังก์ชันแปลภาษา (Smart System V.3)
 # ==========================================
 
-def translate_title(text):
-    if not client or not text: return text
-    prompt = f"""
-    Translate this Japanese novel title to Thai.
-    Style: Catchy, Short, Natural (Teenager/Light Novel style).
-    Strict Rules: Output ONLY the translated text. No explanations.
-    Original: {text}
-    """
-    try:
-        res = client.models.generate_content(
-            model='gemini-1.5-flash', contents=prompt,
-            config=types.GenerateContentConfig(safety_settings=[
-                types.SafetySetting(category='HARM_CATEGORY_HARASSMENT', threshold='BLOCK_NONE'),
-                types.SafetySetting(category='HARM_CATEGORY_HATE_SPEECH', threshold='BLOCK_NONE'),
-                types.SafetySetting(category='HARM_CATEGORY_SEXUALLY_EXPLICIT', threshold='BLOCK_NONE'),
-                types.SafetySetting(category='HARM_CATEGORY_DANGEROUS_CONTENT', threshold='BLOCK_NONE')
-            ])
-        )
-        return res.text.strip().replace('"', '') if res.text else text
-    except: return text
-
-def translate_smart(text, retry_count=0):
-    if not client or not text: return None, "Error"
-    
-    # --- 🛡️ กลยุทธ์ 1-3: พยายามแปลทั้งก้อน ---
-    prompts = [
-        # รอบ 0: ปกติ
-        f"แปลนิยายญี่ปุ่นนี้เป็นไทย สำนวนวัยรุ่น (เก็บอารมณ์ครบ):\n{text[:15000]}",
-        # รอบ 1: Soften
-        f"แปลโดยเลี่ยงคำล่อแหลมและรุนแรง (Soft Version):\n{text[:15000]}",
-        # รอบ 2: Summary
-        f"สรุปเนื้อเรื่องตอนนี้เป็นภาษาไทย (ตัดฉากเรททิ้ง เล่าแค่เหตุการณ์):\n{text[:15000]}"
-    ]
-
-    if retry_count < 3:
-        try:
-            prompt = prompts[retry_count]
-            if retry_count > 0: print(f"   🔧 แก้เกมรอบที่ {retry_count}...")
-            
-            res = client.models.generate_content(
-                model='gemini-1.5-flash', 
-                contents=prompt,
-                config=types.GenerateContentConfig(safety_settings=[
-                    types.SafetySetting(category='HARM_CATEGORY_HARASSMENT', threshold='BLOCK_NONE'),
-                    types.SafetySetting(category='HARM_CATEGORY_HATE_SPEECH', threshold='BLOCK_NONE'),
-                    types.SafetySetting(category='HARM_CATEGORY_SEXUALLY_EXPLICIT', threshold='BLOCK_NONE'),
-                    types.SafetySetting(category='HARM_CATEGORY_DANGEROUS_CONTENT', threshold='BLOCK_NONE')
-                ])
-            )
-            if res.text and res.text.strip(): return res.text, None
-        except Exception as e:
-            if "429" in str(e): time.sleep(10); return translate_smart(text, retry_count)
-            pass 
-        
-        time.sleep(2)
-        return translate_smart(text, retry_count + 1)
-
-    # ถ้าหลุดมาถึงตรงนี้คือไม่ไหวแล้ว
-    fallback = "⚠️ เนื้อหาตอนนี้แรงเกินไป ระบบไม่สามารถแปลได้ (กรุณาอ่านต้นฉบับ)"
-    return fallback, None
+def translate_title(text, novel=None):
+    return get_translator().translate_title(text, novel)
+
+def translate_segments(text, novel=None):
+    # เหมือน Translator.translate_smart + segments (ย่อหน้าต้นฉบับ -> บรรทัดคำแปล) ไว้แปลใหม่เฉพาะส่วนที่แก้
+    return get_translator().translate_segments(text, novel)
+
 
 # ==========================================
 # 🛠️ ฟังก์ชันจัดการ JSON & Notification
 # ==========================================
 
 def save_to_json(novel_url, novel_name_thai, ep_data):
-    data = {}
-    if os.path.exists(JSON_DB_FILE):
-        with open(JSON_DB_FILE, "r", encoding="utf-8") as f:
-            try:
-                content = f.read()
-                if content: data = json.loads(content)
-                if isinstance(data, list): data = {} 
-            except: data = {}
-
-    if novel_url not in data:
-        data[novel_url] = { "title": novel_name_thai, "chapters": [] }
-    
-    data[novel_url]["title"] = novel_name_thai
-    chapters = data[novel_url]["chapters"]
-    existing_idx = next((index for (index, d) in enumerate(chapters) if d["link"] == ep_data["link"]), None)
-    
-    if existing_idx is not None:
-        chapters[existing_idx] = ep_data
-    else:
-        chapters.append(ep_data)
-        
-    data[novel_url]["chapters"] = chapters
-
-    with open(JSON_DB_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-        print(f"💾 อัปเดตเว็บแล้ว: {ep_data['title']}")
+    # เขียนแค่ไฟล์ของตอนนั้น (store มี lock ของตัวเอง) novels.json จะส่งออกรวดเดียวตอนจบ
+    with report.stage("save", novel=novel_url, ep_id=ep_data['ep_id']):
+        store.upsert(novel_url, novel_name_thai, ep_data)
+    print(f"💾 อัปเดตเว็บแล้ว: {ep_data['title']}")
 
 def send_discord_notification(webhook_url, novel_name, ep_title, link):
-    if not webhook_url: return
-    msg = {
-        "content": f"🚨 **ตอนใหม่มาแล้ว!**\n📚 เรื่อง: **{novel_name}**\n📄 ตอน: **{ep_title}**\n\n🔗 ต้นฉบับ: {link}\n✨ *เนื้อหาแปลไทยอัปเดตลงเว็บแล้วครับ!*"
-    }
-    requests.post(webhook_url, json=msg)
+    # แค่จดไว้ -> จบเรื่องแล้วค่อยรวมเป็นข้อความเดียวต่อ webhook ส่งเบื้องหลัง (notifier.py)
+    notifier.add(webhook_url, novel_name, ep_title, link)
 
 # ==========================================
 # 🛠️ Crawler Logic
@@ -164,35 +138,44 @@ class Episode:
         self.link = link
         self.ep_id = int(ep_id)
 
-def get_latest_episode_from_web(novel_url):
-    try:
-        r = scraper.get(novel_url)
-        if r.status_code != 200: return None
-        soup = BeautifulSoup(r.text, 'html.parser')
-        
-        target = re.compile(r'/works/\d+/episodes/(\d+)')
-        links = soup.find_all('a', href=target)
-        
-        if links:
-            last_ep = links[-1]
-            match = target.search(last_ep['href'])
-            ep_id = match.group(1) if match else 0
-            title = last_ep.text.strip() or f"Episode {ep_id}"
-            link = "https://kakuyomu.jp" + last_ep['href'] if last_ep['href'].startswith('/') else last_ep['href']
-            return Episode(title, link, ep_id)
-        return None
-    except: return None
+def get_episodes_from_web(novel_url, toc_state):
+    # ดึงสารบัญครั้งเดียว -> ทุกตอน (เรียงตาม ep_id)
+    # คืน (None, info) ถ้าสารบัญไม่เปลี่ยนจากรอบก่อน (304 หรือ hash เท่าเดิม) -> ไม่ต้อง parse
+    # ยังมีตอนค้าง (ติด safety / เกิน MAX_CATCHUP) -> ไม่ส่ง header แบบมีเงื่อนไข ต้องได้สารบัญเต็มมาไล่ตอนที่เหลือ
+    h = {}
+    if toc_state.get('complete'):
+        if toc_state.get('etag'): h['If-None-Match'] = toc_state['etag']
+        if toc_state.get('last_modified'): h['If-Modified-Since'] = toc_state['last_modified']
+    kakuyomu_limiter.wait(novel_url)
+    with report.stage("fetch", kind="toc", url=novel_url) as ev:
+        r = get_scraper().get(novel_url, headers=h, timeout=20)
+        ev["status"] = r.status_code
+    info = {
+        'etag': r.headers.get('ETag') or toc_state.get('etag'),
+        'last_modified': r.headers.get('Last-Modified') or toc_state.get('last_modified'),
+        'hash': toc_state.get('hash'),
+    }
+    if r.status_code == 304: return None, info
+    if r.status_code != 200: raise Exception(f"HTTP {r.status_code}")
+    info['hash'] = hashlib.sha256(r.content).hexdigest()
+    if info['hash'] == toc_state.get('hash') and toc_state.get('complete'): return None, info
+
+    with report.stage("parse", kind="toc", url=novel_url):
+        toc = parse_toc(r.text, novel_url)
+    return [Episode(e['title'] or f"Episode {e['ep_id']}", e['link'], e['ep_id']) for e in toc['episodes']], info
 
 def get_content(url, main_url):
     h = {'Referer': main_url, 'Accept-Language': 'ja'}
     for _ in range(3):
         try:
-            time.sleep(2)
-            r = scraper.get(url, headers=h, timeout=20)
+            kakuyomu_limiter.wait(url)
+            with report.stage("fetch", kind="episode", url=url) as ev:
+                r = get_scraper().get(url, headers=h, timeout=20)
+                ev["status"] = r.status_code
             if r.status_code == 200:
-                s = BeautifulSoup(r.text, 'html.parser')
-                b = s.select_one('.widget-episodeBody') or s.select_one('#contentMain-inner')
-                if b: return b.get_text(separator="\n", strip=True)
+                with report.stage("parse", kind="episode", url=url):
+                    content = parse_episode(r.text, url)['content']
+                if content: return content
         except: pass
     return None
 
@@ -200,67 +183,204 @@ def get_content(url, main_url):
 # 🚀 Main Process
 # ==========================================
 
+def load_known_ids(novel, episodes, toc_state, last_link):
+    # คืน (known, failed): known = แปลสำเร็จแล้ว | failed = {ep_id: {attempts, next}} ตอนที่บันทึกเป็นข้อความ "แปลไม่ได้"
+    # ตอนใน failed ไม่ใช่ตอนใหม่ -> retry_failed ลองใหม่ตามงบ/ระยะห่างของมันเอง ไม่แย่งคิวตอนใหม่
+    if 'failed' in toc_state: failed = dict(toc_state['failed'])
+    else:
+        failed = {c['ep_id']: {"attempts": 0, "next": 0} for c in store.chapters(novel['url'])
+                  if is_failed((store.get_chapter(novel['url'], c['link']) or {}).get('content'))}
+    if 'known' in toc_state: return set(toc_state['known']) - set(failed), failed
+    # รอบแรกหลังเปลี่ยนระบบ: ถือว่าตอนที่ไม่เกินลิงก์ล่าสุดใน db_file และตอนที่แปลลงเว็บแล้ว = รู้จักแล้ว
+    known = {c['ep_id'] for c in store.chapters(novel['url'])}
+    m = re.search(r'episodes/(\d+)', last_link or "")
+    if m: known |= {str(e.ep_id) for e in episodes if e.ep_id <= int(m.group(1))}
+    return known - set(failed), failed
+
+def process_episode(novel, ep, thai_ep_title):
+    # คืน "ok" แปลสำเร็จ | "blocked" ติด safety (บันทึกข้อความแปลไม่ได้ไว้) | None ดึง/แปลไม่ได้ (รอบหน้าลองใหม่)
+    # ตอนที่มีในคลังแล้ว (ลองแปลตอนที่ติดใหม่) -> แจ้งเตือนเฉพาะเมื่อแปลผ่าน
+    retry = store.has_link(novel['url'], ep.link)
+    print(f"🔁 ลองแปลตอนที่ติดอีกครั้ง: {ep.title}" if retry else f"✨ พบตอนใหม่: {ep.title}")
+    content = get_content(ep.link, novel['url'])
+    if not content:
+        print("❌ ดึงเนื้อหาไม่ได้"); return None
+
+    print("⏳ กำลังแปลเนื้อหา...")
+    # 🟢 ตอนยาวหั่นเป็นก้อนตามย่อหน้า + เก็บ segments ไว้เทียบตอนต้นฉบับถูกแก้
+    translated_content, segments, error_msg = translate_segments(content, novel=novel['url'])
+    if not translated_content:
+        print(f"❌ แปลล้มเหลว: {error_msg}"); return None
+
+    thai_ep_title = thai_ep_title or translate_title(ep.title, novel['url'])
+    
+    # ตรวจสอบว่าเป็นข้อความแจ้งเตือนความล้มเหลวหรือไม่
+    is_safety_error = is_failed(translated_content)
+    if is_safety_error and retry:
+        print("   ⚠️ ยังติด Safety -> คงของเดิมไว้ ไม่แจ้งเตือนซ้ำ"); return "blocked"
+    
+    # ✅ บันทึกลงเว็บ (JSON) เสมอ (คนอ่านจะได้เห็นว่ามีตอนใหม่ แม้จะแปลไม่ได้)
+    ep_data = {
+        "ep_id": str(ep.ep_id),
+        "title": thai_ep_title,
+        "content": translated_content,
+        "link": ep.link,
+        "source_hash": source_hash(content),
+        "segments": segments,
+    }
+    save_to_json(novel['url'], novel['name'], ep_data)
+    
+    # ✅ แจ้งเตือน Discord
+    print("🚀 เพิ่มลงคิวแจ้งเตือน Discord...")
+    send_discord_notification(novel.get('webhook_url'), novel['name'], thai_ep_title, ep.link)
+    
+    # ✅ ตัดสินใจเรื่องการจำค่า (DB)
+    if is_safety_error:
+        print("   ⚠️ ติด Safety -> ไม่บันทึกสถานะล่าสุด (ลองใหม่ใน retry_failed รอบหลัง)")
+        return "blocked"
+    print("   ✅ แปลสำเร็จ -> บันทึกสถานะล่าสุด")
+    if not retry:
+        with open(novel['db_file'], "w") as f: f.write(ep.link)
+    return "ok"
+
+def mark_failed(failed, ep_id):
+    st = failed.setdefault(ep_id, {"attempts": 0, "next": 0})
+    st["attempts"] += 1
+    st["next"] = int(time.time() + RETRY_FAILED_DAYS * 86400 * 2 ** min(st["attempts"] - 1, 5))
+
+def retry_failed(novel, known, failed):
+    # 🔁 ตอนเก่าที่ติด safety: ลองใหม่ทีละไม่กี่ตอน (ตอนล่าสุดก่อน) เฉพาะตอนที่ถึงเวลา ใช้ลิงก์จากคลัง ไม่ต้องพึ่งสารบัญ
+    if RETRY_FAILED_PER_RUN <= 0 or not failed: return
+    metas = {c['ep_id']: c for c in store.chapters(novel['url'])}
+    for ep_id in [e for e in failed if e not in metas]: failed.pop(ep_id)   # ไม่อยู่ในคลังแล้ว -> กลับไปเป็นตอนใหม่
+    due = sorted((e for e, st in failed.items() if st["next"] <= time.time()), key=int, reverse=True)
+    for ep_id in due[:RETRY_FAILED_PER_RUN]:
+        meta = metas[ep_id]
+        result = process_episode(novel, Episode(meta['title'], meta['link'], ep_id), meta['title'])
+        if result == "ok":
+            failed.pop(ep_id); known.add(ep_id)
+        else: mark_failed(failed, ep_id)
+
+def recheck_revisions(novel, fresh=()):
+    # ✏️ เช็คตอนที่แปลแล้วว่าผู้แต่งแก้ต้นฉบับไหม: ต้นฉบับเปลี่ยน -> แปลใหม่เฉพาะย่อหน้าที่แก้
+    # ตอนละครั้งต่อ RECHECK_DAYS วัน ไม่เกิน RECHECK_PER_RUN ตอนต่อรอบ ตอนใหม่สุดก่อน (ตอนล่าสุดมักถูกแก้บ่อยสุด)
+    # เช็คครบทุกตอนแล้ว -> cron ที่เหลือดึงแค่สารบัญจนกว่าจะครบกำหนด (โดนเว้นระยะ kakuyomu ทุกหน้า)
+    # fresh = ตอนที่เพิ่งดึงต้นฉบับมาแปลรอบนี้ -> นับว่าเช็คแล้ว
+    if RECHECK_PER_RUN <= 0: return
+    checked = store.load_state(novel['url'], "revisions", {})
+    for ep_id in fresh: checked[ep_id] = int(time.time())
+    # ตอนที่แปลไม่ได้ -> retry_failed แปลใหม่ทั้งตอนตามรอบของมันเอง (ตัดออกก่อนนับโควตา ไม่งั้นค้างหัวคิวทุกรอบ)
+    failed = store.load_state(novel['url'], "toc_state", {}).get('failed', {})
+    min_age = RECHECK_DAYS * 86400
+    due = [c for c in store.chapters(novel['url'])
+           if c['ep_id'] not in failed and time.time() - checked.get(c['ep_id'], 0) >= min_age]
+    due.sort(key=lambda c: int(c['ep_id']), reverse=True)
+    fetched = 0
+    for meta in due:
+        if fetched >= RECHECK_PER_RUN: break
+        ep = store.get_chapter(novel['url'], meta['link']) or {}
+        if not ep.get('content') or is_failed(ep['content']): continue
+        fetched += 1
+        source = get_content(meta['link'], novel['url'])
+        if not source: continue
+        checked[meta['ep_id']] = int(time.time())
+        new_hash = source_hash(source)
+        if ep.get('source_hash') == new_hash: continue
+
+        if not ep.get('source_hash'):
+            # ตอนเก่าก่อนมีระบบนี้: จดต้นฉบับปัจจุบันไว้เป็นฐาน (จับคู่ย่อหน้ากับคำแปลเดิมเท่าที่ได้)
+            save_to_json(novel['url'], None, dict(ep, source_hash=new_hash, segments=align_segments(source, ep['content'])))
+            continue
+
+        print(f"✏️ ต้นฉบับถูกแก้: {meta['title']}")
+        revised = get_translator().revise(ep['content'], ep.get('segments'), source, novel['url'])
+        if revised:
+            content, segments, blocks = revised
+            print(f"   🧩 แปลใหม่เฉพาะ {blocks} ช่วงที่เปลี่ยน")
+        else:
+            print("   🔁 จับคู่ย่อหน้าไม่ได้ -> แปลใหม่ทั้งตอน")
+            content, segments, _ = translate_segments(source, novel['url'])
+            if not content or is_failed(content): continue
+        report.record("revision", ep_id=meta['ep_id'], blocks=revised[2] if revised else None)
+        save_to_json(novel['url'], None, dict(ep, content=content, source_hash=new_hash, segments=segments))
+    store.flush()
+    store.save_state(novel['url'], "revisions", checked)
+
 def process_novel(novel):
     print(f"\n--- 🔄 ตรวจสอบ: {novel['name']} ---")
-    webhook = novel.get('webhook_url')
     db_file = novel['db_file']
     
     if not os.path.exists(db_file): open(db_file, "w").write("")
     with open(db_file, "r") as f: last_link = f.read().strip()
 
-    latest = get_latest_episode_from_web(novel['url'])
-    
-    if latest:
-        if latest.link != last_link:
-            print(f"✨ พบตอนใหม่: {latest.title}")
-            
-            content = get_content(latest.link, novel['url'])
-            if content:
-                print("⏳ กำลังแปลเนื้อหา...")
-                # 🟢 ใช้ translate_smart (มี Split Mode)
-                translated_content, error_msg = translate_smart(content)
-                
-                if translated_content:
-                    print("⏳ กำลังแปลชื่อตอน...")
-                    thai_ep_title = translate_title(latest.title)
-                    
-                    # ตรวจสอบว่าเป็นข้อความแจ้งเตือนความล้มเหลวหรือไม่
-                    is_safety_error = "⚠️" in translated_content and "ไม่สามารถแปลได้" in translated_content
-                    
-                    # ✅ บันทึกลงเว็บ (JSON) เสมอ (คนอ่านจะได้เห็นว่ามีตอนใหม่ แม้จะแปลไม่ได้)
-                    ep_data = {
-                        "ep_id": str(latest.ep_id),
-                        "title": thai_ep_title,
-                        "content": translated_content,
-                        "link": latest.link
-                    }
-                    save_to_json(novel['url'], novel['name'], ep_data)
-                    
-                    # ✅ แจ้งเตือน Discord
-                    print("🚀 แจ้งเตือน Discord...")
-                    send_discord_notification(webhook, novel['name'], thai_ep_title, latest.link)
-                    
-                    # ✅ ตัดสินใจเรื่องการจำค่า (DB)
-                    if is_safety_error:
-                        print("   ⚠️ ติด Safety -> ไม่บันทึกสถานะล่าสุด (เพื่อให้รอบหน้าลองใหม่)")
-                    else:
-                        print("   ✅ แปลสำเร็จ -> บันทึกสถานะล่าสุด")
-                        with open(db_file, "w") as f: f.write(latest.link)
-                        
-                else:
-                    print(f"❌ แปลล้มเหลว: {error_msg}")
-            else:
-                print("❌ ดึงเนื้อหาไม่ได้")
-        else:
-            print("😴 ยังไม่มีตอนใหม่")
+    toc_state = store.load_state(novel['url'], "toc_state", {})
+    try:
+        episodes, info = get_episodes_from_web(novel['url'], toc_state)
+    except Exception as e:
+        print(f"❌ เช็คหน้าเว็บไม่สำเร็จ: {e}"); return
+
+    if episodes is None:
+        print("😴 สารบัญไม่เปลี่ยน -> ข้าม")
+        known, failed = set(toc_state.get('known', [])), dict(toc_state.get('failed', {}))
+        retry_failed(novel, known, failed)
+        store.flush()
+        store.save_state(novel['url'], "toc_state", dict(toc_state, **info, known=sorted(known, key=int), failed=failed))
+        notifier.flush(novel.get('webhook_url'))
+        recheck_revisions(novel, known - set(toc_state.get('known', []))); return
+    if not episodes:
+        print("❌ เช็คหน้าเว็บไม่สำเร็จ"); return
+
+    # 🔍 เทียบสารบัญทั้งหมดกับตอนที่รู้จัก -> ตามทุกตอนที่พลาดไปในรอบเดียว
+    known, failed = load_known_ids(novel, episodes, toc_state, last_link)
+    before = set(known)
+    new_eps = [e for e in episodes if str(e.ep_id) not in known and str(e.ep_id) not in failed]
+    store.merge_episode_chain(novel['url'], [{"ep_id": str(e.ep_id), "title": e.title, "link": e.link} for e in episodes])
+
+    if not new_eps:
+        print("😴 ยังไม่มีตอนใหม่")
     else:
-        print("❌ เช็คหน้าเว็บไม่สำเร็จ")
+        if len(new_eps) > MAX_CATCHUP:
+            print(f"📚 ตอนใหม่ {len(new_eps)} ตอน -> รอบนี้ทำ {MAX_CATCHUP} ตอนแรก")
+        new_eps = new_eps[:MAX_CATCHUP]
+        thai_titles = get_translator().translate_titles({str(e.ep_id): e.title for e in new_eps}, novel['url']) if len(new_eps) > 1 else {}
+        for ep in new_eps:
+            result = process_episode(novel, ep, thai_titles.get(str(ep.ep_id)))
+            if result == "ok": known.add(str(ep.ep_id))
+            elif result == "blocked": mark_failed(failed, str(ep.ep_id))
+    retry_failed(novel, known, failed)
+
+    # ตอนที่ติด safety อยู่ใน failed (ลองใหม่จากคลังเอง) -> ไม่ทำให้สารบัญ "ไม่ครบ" จนปิดการข้ามแบบมีเงื่อนไข
+    complete = all(str(e.ep_id) in known or str(e.ep_id) in failed for e in episodes)
+    # เนื้อหาตอนต้องลงดิสก์ก่อนจด known (ไม่งั้น process ตายกลางทาง = ตอนถูกนับว่ามีแล้วแต่เนื้อหาหาย)
+    store.flush()
+    store.save_state(novel['url'], "toc_state", dict(info, known=sorted(known, key=int), failed=failed, complete=complete))
+    notifier.flush(novel.get('webhook_url'))
+    recheck_revisions(novel, known - before)
 
 def main():
+    cold_start = time.perf_counter() - STARTED
+    report.record("cold_start", cold_start, part="startup")
     print("🤖 Daily Bot Checking (Smart V.3 + Split Mode)...")
-    for novel in NOVEL_LIST:
-        process_novel(novel)
-        print("-" * 30)
+    print(f"⚡ เริ่มทำงานใน {cold_start:.2f} วินาที (import + ตั้งค่า)")
+    print(f"🧵 ทำพร้อมกัน {NOVEL_WORKERS} เรื่อง | Gemini พร้อมกัน {GEMINI_CONCURRENCY}")
+    start = time.time()
+    # รันทุกเรื่องพร้อมกัน -> เวลารวมเท่ากับเรื่องที่ช้าที่สุด ไม่ใช่ผลรวมทุกเรื่อง
+    with ThreadPoolExecutor(max_workers=max(1, NOVEL_WORKERS)) as pool:
+        futures = {pool.submit(process_novel, novel): novel for novel in NOVEL_LIST}
+        for fut, novel in futures.items():
+            try: fut.result()
+            except Exception as e: print(f"❌ {novel['name']}: {e}")
+    store.export_json()
+    notifier.close()
+    if translator is not None:
+        from translator import report_summaries
+        report_summaries(translator)
+    else:
+        print("😴 ไม่มีอะไรต้องแปล -> ไม่ได้โหลดระบบแปล (google.genai)")
+    print(notifier.summary())
+    print("-" * 30)
+    print(f"⏱️ เสร็จใน {time.time() - start:.1f} วินาที (cold start {cold_start:.2f} วินาที)")
+    report.write("check_novel")
 
 if __name__ == "__main__":
     main()
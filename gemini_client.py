@@ -0,0 +1,133 @@
+import os
+import random
+import re
+import threading
+import time
+from run_report import report
+
+# ==========================================
+# 🚦 ตัวห่อ Gemini client: คุมโควตา RPM/TPM + backoff แบบมีเพดาน
+# ==========================================
+# แทนการ sleep 10 วิแล้วเรียกตัวเองซ้ำไม่รู้จบเวลาเจอ 429
+
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "60"))            # requests ต่อนาที
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "1000000"))       # tokens ต่อนาที
+MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "5"))      # ต่อหนึ่งคำขอ
+RETRY_BUDGET = int(os.getenv("GEMINI_RETRY_BUDGET", "60"))   # รวมทั้งรอบการรัน
+BACKOFF_BASE = 2.0
+BACKOFF_CAP = 60.0
+
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    # เติม rate_per_min หน่วยต่อนาที เก็บได้สูงสุด capacity (ค่าเริ่มต้น = 1 นาทีเต็ม)
+    def __init__(self, rate_per_min, capacity=None):
+        self.rate = rate_per_min / 60.0
+        self.capacity = capacity or rate_per_min
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, n=1):
+        # คืนเวลาที่ต้องรอ (วินาที)
+        n = min(n, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return waited
+                delay = (n - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def adjust(self, n):
+        # ใช้จริงมากกว่า/น้อยกว่าที่ประเมินไว้ -> หัก/คืนส่วนต่าง (ติดลบได้ = รอบหน้ารอนานขึ้น)
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - n)
+
+
+def error_code(e):
+    code = getattr(e, "code", None) or getattr(e, "status_code", None)
+    if isinstance(code, int): return code
+    m = re.search(r'\b(429|500|502|503|504)\b', str(e))
+    return int(m.group(1)) if m else None
+
+
+def server_retry_delay(e):
+    # RetryInfo.retryDelay: "17s" หรือข้อความ "Please retry in 17.5s"
+    m = re.search(r'retryDelay["\']?\s*[:=]\s*["\']?(\d+(?:\.\d+)?)s', str(e)) or \
+        re.search(r'retry in (\d+(?:\.\d+)?)\s*s', str(e), re.I)
+    return float(m.group(1)) if m else None
+
+
+def is_retryable(e):
+    if error_code(e) in RETRYABLE_CODES: return True
+    return isinstance(e, (TimeoutError, ConnectionError))
+
+
+def estimate_tokens(text):
+    # ญี่ปุ่น/ไทย ~1 token ต่อตัวอักษร เผื่อคำตอบยาวพอๆ กับคำขอ
+    return max(1, len(text or "")) * 2
+
+
+class GeminiClient:
+    def __init__(self, client, rpm=GEMINI_RPM, tpm=GEMINI_TPM, max_retries=MAX_RETRIES, retry_budget=RETRY_BUDGET):
+        self.client = client
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.retry_budget = retry_budget
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0   # รอโควตา RPM/TPM
+        self.backoff_seconds = 0.0     # รอหลังโดน 429/5xx
+
+    def _take_retry(self):
+        with self._lock:
+            if self.retry_budget <= 0: return False
+            self.retry_budget -= 1
+            self.retries += 1
+            return True
+
+    def generate_content(self, model, contents, config=None):
+        estimate = estimate_tokens(contents)
+        attempt = 0
+        while True:
+            waited = self.requests.acquire() + self.tokens.acquire(estimate)
+            with self._lock:
+                self.throttled_seconds += waited
+                self.calls += 1
+            if waited > 0: report.record("throttle", waited)
+            try:
+                res = self.client.models.generate_content(model=model, contents=contents, config=config)
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries or not self._take_retry(): raise
+                # exponential backoff + jitter แต่ถ้าเซิร์ฟเวอร์บอกเวลามาให้ใช้ตามนั้น
+                delay = server_retry_delay(e)
+                if delay is None: delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                else: delay += random.uniform(0, 1)
+                print(f"   ⏳ Gemini {error_code(e) or 'error'} -> รอ {delay:.1f} วิ (ครั้งที่ {attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+                with self._lock: self.backoff_seconds += delay
+                report.record("backoff", delay, code=error_code(e), attempt=attempt + 1)
+                attempt += 1
+                continue
+
+            usage = getattr(res, "usage_metadata", None)
+            total = getattr(usage, "total_token_count", None) if usage else None
+            if total: self.tokens.adjust(total - estimate)
+            return res
+
+    def summary(self):
+        return (f"🚦 Gemini: เรียก {self.calls} ครั้ง | retry {self.retries} | "
+                f"รอโควตา {self.throttled_seconds:.1f} วิ | backoff {self.backoff_seconds:.1f} วิ")
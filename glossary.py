@@ -0,0 +1,183 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from google.genai import types
+from run_report import report, usage_tokens
+
+# ==========================================
+# 📖 อภิธานศัพท์ต่อเรื่อง (ชื่อตัวละคร / คำเรียก / ศัพท์ที่ใช้ซ้ำ)
+# ==========================================
+# เก็บใน data/<work_id>/glossary.json ผ่าน store.save_state
+#   {"terms": {"ญี่ปุ่น": "ไทย"}, "counts": {"ญี่ปุ่น": จำนวนตอนที่เจอ}}
+#
+# - หลังแปลแต่ละตอน: หาคำที่น่าจะเป็นชื่อ/ศัพท์จากต้นฉบับ (คาตาคานะ, ชื่อ+さん/くん/先輩 ...)
+#   เจอซ้ำหลายตอนแต่ยังไม่มีคำแปล -> รวมขอคำแปลครั้งเดียว (JSON) จากต้นฉบับ + คำแปลของตอนนั้น
+# - ตอนแปล: แนบอภิธานศัพท์เป็น system instruction
+#   ยาวพอ (>= GLOSSARY_CACHE_MIN_TOKENS) -> สร้าง Gemini context cache ครั้งเดียวต่อรอบ แล้วอ้างชื่อ cache
+#   สั้นกว่านั้น -> ส่งเฉพาะคำที่อยู่ในก้อนนั้นจริงๆ (ไม่ส่งทั้งอภิธานศัพท์ทุกครั้ง)
+
+GLOSSARY_MAX_TERMS = int(os.getenv("GLOSSARY_MAX_TERMS", "300"))
+GLOSSARY_MIN_COUNT = int(os.getenv("GLOSSARY_MIN_COUNT", "2"))          # เจอกี่ตอนถึงนับเป็นศัพท์ประจำเรื่อง
+GLOSSARY_UPDATE_BATCH = int(os.getenv("GLOSSARY_UPDATE_BATCH", "5"))    # ค้างกี่คำถึงขอคำแปล
+CACHE_MIN_TOKENS = int(os.getenv("GLOSSARY_CACHE_MIN_TOKENS", "4096"))  # ขั้นต่ำของ context cache
+CACHE_TTL_SECONDS = int(os.getenv("GLOSSARY_CACHE_TTL", "3600"))
+
+HONORIFICS = "さん|くん|君|ちゃん|様|さま|先輩|先生|殿|氏"
+TERM_PATTERNS = [
+    re.compile(r'[ァ-ヴー・]{3,}'),                              # ชื่อ/ศัพท์คาตาคานะ
+    re.compile(rf'([一-龥々]{{1,4}})(?:{HONORIFICS})'),          # ชื่อคันจิ + คำเรียก
+    re.compile(r'「([一-龥々]{2,6})」'),                          # ชื่อเฉพาะในวงเล็บ
+]
+
+INSTRUCTION = "You translate a Japanese web novel into Thai. Keep names and recurring terms consistent with this glossary (Japanese = Thai):\n"
+
+UPDATE_PROMPT = """
+    Below is a Japanese novel excerpt and its Thai translation.
+    For each Japanese term in the list, give the Thai rendering used (or the most natural one).
+    Return a JSON array of objects {{"jp": ..., "thai": ...}}.
+    Terms: {terms}
+    Japanese: {source}
+    Thai: {thai}
+    """
+UPDATE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"jp": {"type": "STRING"}, "thai": {"type": "STRING"}},
+        "required": ["jp", "thai"],
+    },
+}
+EXCERPT_CHARS = 3000
+
+
+def find_terms(text):
+    found = set()
+    for pattern in TERM_PATTERNS:
+        for m in pattern.finditer(text or ""):
+            term = m.group(1) if m.groups() else m.group(0)
+            if term.strip("ー・"): found.add(term)
+    return found
+
+
+def estimate(text):
+    # ญี่ปุ่น/ไทย ~1 token ต่อตัวอักษร
+    return len(text or "")
+
+
+class GlossaryBook:
+    def __init__(self, store, raw_client=None, model=None):
+        self.store = store
+        self.raw_client = raw_client
+        self.model = model
+        self._lock = threading.RLock()
+        self._data = {}      # novel -> {"terms", "counts"}
+        self._remote = {}    # (novel, โมเดล) -> (ข้อความ instruction, ชื่อ cache) (context cache ใช้ได้กับโมเดลเดียว)
+        self.stats = Counter()
+
+    def _load(self, novel):
+        with self._lock:
+            if novel not in self._data:
+                self._data[novel] = self.store.load_state(novel, "glossary", None) or {"terms": {}, "counts": {}}
+            return self._data[novel]
+
+    def terms(self, novel):
+        with self._lock: return dict(self._load(novel)["terms"])
+
+    # ---------- แนบตอนแปล ----------
+
+    def _instruction(self, terms):
+        return INSTRUCTION + "\n".join(f"{jp} = {th}" for jp, th in sorted(terms.items()))
+
+    def _context_cache(self, novel, text, model):
+        # สร้าง context cache ของอภิธานศัพท์ (ครั้งเดียวต่อเวอร์ชันต่อโมเดล) คืนชื่อ cache หรือ None
+        if not self.raw_client or not hasattr(self.raw_client, "caches"): return None
+        with self._lock:
+            old = self._remote.get((novel, model))
+            if old and old[0] == text: return old[1]
+            try:
+                cached = self.raw_client.caches.create(model=model, config=types.CreateCachedContentConfig(
+                    system_instruction=text, ttl=f"{CACHE_TTL_SECONDS}s", display_name=f"glossary-{int(time.time())}"))
+            except Exception as e:
+                print(f"   ⚠️ สร้าง context cache ไม่ได้ -> ส่งเป็น system instruction: {e}")
+                self.raw_client = None
+                return None
+            if old:
+                try: self.raw_client.caches.delete(name=old[1])
+                except Exception: pass
+            self._remote[(novel, model)] = (text, cached.name)
+            self.stats["caches_created"] += 1
+            return cached.name
+
+    def instruction_for(self, novel, text):
+        # เฉพาะคำที่อยู่ในข้อความนี้ (ใช้กับ batch ด้วย) ไม่มีเลย -> None
+        used = {jp: th for jp, th in self.terms(novel).items() if jp in text}
+        return self._instruction(used) if used else None
+
+    def config_for(self, novel, text, base, model=None):
+        # คืน GenerateContentConfig ที่แนบอภิธานศัพท์แล้ว (ไม่มีศัพท์ -> base เดิม)
+        if not novel: return base
+        terms = self.terms(novel)
+        if not terms: return base
+        full = self._instruction(terms)
+        if estimate(full) >= CACHE_MIN_TOKENS:
+            name = self._context_cache(novel, full, model or self.model)
+            if name:
+                with self._lock:
+                    self.stats["calls_cached"] += 1
+                    self.stats["tokens_from_cache"] += estimate(full)
+                return base.model_copy(update={"cached_content": name})
+
+        sent = self.instruction_for(novel, text)
+        if not sent: return base
+        with self._lock:
+            self.stats["calls_inline"] += 1
+            self.stats["tokens_sent"] += estimate(sent)
+            self.stats["tokens_skipped"] += estimate(full) - estimate(sent)
+        return base.model_copy(update={"system_instruction": sent})
+
+    # ---------- เรียนรู้จากตอนที่แปลแล้ว ----------
+
+    def learn(self, novel, source, translated, generate):
+        # generate(prompt, config) = Translator._generate (ผ่านโควตา/concurrency เดิม)
+        if not novel or not source or not translated: return
+        with self._lock:
+            data = self._load(novel)
+            for term in find_terms(source):
+                data["counts"][term] = data["counts"].get(term, 0) + 1
+            pending = [t for t, n in sorted(data["counts"].items(), key=lambda kv: -kv[1])
+                       if n >= GLOSSARY_MIN_COUNT and t not in data["terms"] and t in source]
+            pending = pending[:max(0, GLOSSARY_MAX_TERMS - len(data["terms"]))]
+            self.store.save_state(novel, "glossary", data)
+        if len(pending) < GLOSSARY_UPDATE_BATCH: return
+
+        config = types.GenerateContentConfig(response_mime_type="application/json", response_schema=UPDATE_SCHEMA)
+        prompt = UPDATE_PROMPT.format(terms=json.dumps(pending, ensure_ascii=False),
+                                      source=source[:EXCERPT_CHARS], thai=translated[:EXCERPT_CHARS])
+        try:
+            with report.stage("glossary", terms=len(pending)) as ev:
+                res = generate(prompt, config)
+                ev.update(usage_tokens(res))
+            rows = json.loads(res.text or "[]")
+        except Exception as e:
+            print(f"   ⚠️ อัปเดตอภิธานศัพท์ไม่สำเร็จ: {e}"); return
+
+        added = 0
+        with self._lock:
+            data = self._load(novel)
+            for row in rows:
+                jp, th = (row.get("jp") or "").strip(), (row.get("thai") or "").strip()
+                if jp in pending and th and jp not in data["terms"]:
+                    data["terms"][jp] = th; added += 1
+            self.store.save_state(novel, "glossary", data)
+            self.stats["updates"] += 1
+            self.stats["update_tokens"] += usage_tokens(res)["tokens_in"] + usage_tokens(res)["tokens_out"]
+        if added: print(f"   📖 เพิ่มศัพท์ลงอภิธานศัพท์ {added} คำ ({len(data['terms'])} คำแล้ว)")
+
+    def summary(self):
+        s = self.stats
+        saved = s["tokens_from_cache"] + s["tokens_skipped"]
+        return (f"📖 Glossary: แนบแบบ cache {s['calls_cached']} ครั้ง | แบบ inline {s['calls_inline']} ครั้ง "
+                f"(~{s['tokens_sent']} tokens) | ประหยัด ~{saved} tokens | อัปเดต {s['updates']} ครั้ง (~{s['update_tokens']} tokens)")
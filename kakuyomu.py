@@ -0,0 +1,135 @@
+import re
+from urllib.parse import urljoin
+
+# ==========================================
+# 🔎 ตัวแกะหน้าเว็บ kakuyomu (อ่านทีเดียวได้ครบ: ชื่อ / เนื้อหา / ตอนถัดไป / สารบัญ)
+# ==========================================
+# ใช้ lxml ถ้าติดตั้งไว้ (เร็วกว่ามาก) ไม่มีก็ถอยไปใช้ BeautifulSoup แบบเดิม
+
+try:
+    import lxml.html
+    BACKEND = "lxml"
+except ImportError:
+    from bs4 import BeautifulSoup
+    BACKEND = "bs4"
+
+BASE_URL = "https://kakuyomu.jp"
+EPISODE_HREF = re.compile(r'/works/\d+/episodes/(\d+)')
+NEXT_TEXT = "次のエピソード"
+_SKIP_TAGS = {"rt", "rp", "script", "style"}
+
+
+def _has_class(cls):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+
+# ---------- lxml ----------
+
+def _lxml_text(el):
+    # เลียนแบบ get_text(separator="\n", strip=True) ของ bs4 (ไม่เอาคำอ่าน furigana / comment)
+    parts = []
+
+    def walk(node):
+        if node.text: parts.append(node.text)
+        for child in node:
+            if isinstance(child.tag, str) and child.tag not in _SKIP_TAGS: walk(child)
+            if child.tail: parts.append(child.tail)
+
+    walk(el)
+    return "\n".join(p.strip() for p in parts if p.strip())
+
+
+def _lxml_first(doc, *xpaths):
+    for xp in xpaths:
+        found = doc.xpath(xp)
+        if found: return found[0]
+    return None
+
+
+def _lxml_episode(html, url):
+    doc = lxml.html.fromstring(html)
+    title = _lxml_first(doc, f"//*[{_has_class('widget-episodeTitle')}]")
+    body = _lxml_first(doc, f"//*[{_has_class('widget-episodeBody')}]", "//*[@id='contentMain-inner']")
+    nxt = _lxml_first(doc, f"//a[{_has_class('widget-episode-navigation-next')}]",
+                      "//a[@id='contentMain-readNextEpisode']", f"//a[contains(., '{NEXT_TEXT}')]")
+    return {
+        "title": title.text_content().strip() if title is not None else None,
+        "content": _lxml_text(body) if body is not None else None,
+        "next_link": urljoin(url, nxt.get("href")) if nxt is not None and nxt.get("href") else None,
+    }
+
+
+def _lxml_toc(html, url):
+    doc = lxml.html.fromstring(html)
+    title = _lxml_first(doc, "//*[@id='workTitle']", "//h1")
+    first = _lxml_first(doc, "//a[@id='readFromFirstEpisode']")
+    anchors = []
+    for a in doc.xpath("//a[contains(@href, '/episodes/')]"):
+        href = a.get("href")
+        if not EPISODE_HREF.search(href): continue
+        t = _lxml_first(a, ".//*[contains(translate(@class, 'TITLE', 'title'), 'title')]")
+        anchors.append((href, _lxml_text(t) if t is not None else _lxml_text_no_time(a), t is not None))
+    return (title.text_content().strip() if title is not None else None,
+            first.get("href") if first is not None else None, anchors)
+
+
+def _lxml_text_no_time(a):
+    for tm in a.xpath(".//time"): tm.drop_tree()
+    return " ".join(_lxml_text(a).split("\n"))
+
+
+# ---------- bs4 (สำรอง) ----------
+
+def _bs4_episode(html, url):
+    s = BeautifulSoup(html, 'html.parser')
+    title = s.select_one('.widget-episodeTitle')
+    body = s.select_one('.widget-episodeBody') or s.select_one('#contentMain-inner')
+    nxt = s.select_one('a.widget-episode-navigation-next') or s.select_one('a#contentMain-readNextEpisode') \
+        or s.find('a', string=re.compile(NEXT_TEXT))
+    return {
+        "title": title.text.strip() if title else None,
+        "content": body.get_text(separator="\n", strip=True) if body else None,
+        "next_link": urljoin(url, nxt['href']) if nxt and nxt.get('href') else None,
+    }
+
+
+def _bs4_toc(html, url):
+    s = BeautifulSoup(html, 'html.parser')
+    title = s.select_one('#workTitle') or s.select_one('h1')
+    first = s.select_one('a#readFromFirstEpisode')
+    anchors = []
+    for a in s.find_all('a', href=EPISODE_HREF):
+        t = a.find(class_=re.compile('title', re.I))
+        if not t:
+            for tm in a.find_all('time'): tm.extract()
+        anchors.append((a['href'], (t or a).get_text(" ", strip=True), t is not None))
+    return (title.text.strip() if title else None, first['href'] if first else None, anchors)
+
+
+# ==========================================
+# 📤 API ที่สคริปต์ใช้
+# ==========================================
+
+def parse_episode(html, url):
+    # {"title", "content", "next_link", "ep_id"}
+    data = (_lxml_episode if BACKEND == "lxml" else _bs4_episode)(html, url)
+    m = EPISODE_HREF.search(url)
+    data["ep_id"] = m.group(1) if m else None
+    return data
+
+
+def parse_toc(html, url):
+    # {"title": ชื่อเรื่อง, "first_link": ลิงก์ตอนแรก, "episodes": [{ep_id, title, link}] เรียงตาม ep_id}
+    title, first, anchors = (_lxml_toc if BACKEND == "lxml" else _bs4_toc)(html, url)
+    episodes, from_toc = {}, set()
+    for href, ep_title, is_toc_item in anchors:
+        link = urljoin(BASE_URL, href)
+        ep_id = EPISODE_HREF.search(link).group(1)
+        # ปุ่มอย่าง "1話目から読む" ก็ลิงก์ไปตอนเดียวกัน -> ชื่อจากรายการสารบัญ (มี element title) ชนะ
+        if link in from_toc: continue
+        if link not in episodes or is_toc_item or (ep_title and not episodes[link]["title"]):
+            episodes[link] = {"ep_id": ep_id, "title": ep_title, "link": link}
+            if is_toc_item: from_toc.add(link)
+    episodes = sorted(episodes.values(), key=lambda e: int(e["ep_id"]))
+    first_link = urljoin(url, first) if first else (episodes[0]["link"] if episodes else None)
+    return {"title": title, "first_link": first_link, "episodes": episodes}
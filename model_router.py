@@ -0,0 +1,181 @@
+import os
+import re
+import threading
+import time
+from collections import Counter
+from run_report import report, usage_tokens
+from segments import paragraphs
+
+# ==========================================
+# 🧭 เลือกโมเดลเป็นชั้น: โมเดลถูก/เร็วก่อน -> ไม่ผ่านตรวจคุณภาพหรือโดนบล็อก ค่อยยกไปโมเดลใหญ่
+# ==========================================
+# ชั้น fast (GEMINI_FAST_MODEL) แปลชื่อตอน + เนื้อหาปกติทั้งหมด
+# ชั้น strong (GEMINI_MODEL ของแต่ละสคริปต์) ใช้เฉพาะเมื่อ:
+#   - คำตอบว่าง / โดน safety บล็อก
+#   - ตรวจคุณภาพในเครื่องไม่ผ่าน (ไม่เสีย API): ความยาวเทียบต้นฉบับผิดปกติ, เหลือภาษาญี่ปุ่นเยอะ,
+#     มีคำเกริ่นของ LLM ("เยี่ยมเลย! จัดไปแบบ..." / "นี่คือคำแปล:") ที่เคยหลุดลง novels.json
+# ชั้นสุดท้ายไม่ผ่านตรวจ -> ใช้คำตอบนั้น (ตัดคำเกริ่นทิ้ง) ดีกว่าไม่มีอะไรเลย
+#
+# ท้ายรอบ router.summary() บอกจำนวนครั้ง / latency / token / ค่าใช้จ่ายโดยประมาณต่อชั้น
+
+FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", "gemini-2.5-flash")
+
+# USD ต่อ 1M token (เข้า, ออก) ไว้ประเมินค่าใช้จ่าย (ตั้งเองได้ด้วย GEMINI_PRICE_<ชื่อโมเดล>="เข้า,ออก")
+PRICES = {
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00),
+}
+
+MIN_LENGTH_RATIO = float(os.getenv("ROUTER_MIN_LENGTH_RATIO", "0.5"))   # ไทยสั้นกว่าญี่ปุ่นครึ่งหนึ่ง = น่าจะตกหล่น
+MAX_LENGTH_RATIO = float(os.getenv("ROUTER_MAX_LENGTH_RATIO", "4.0"))   # ยาวเกิน 4 เท่า = น่าจะแต่งเพิ่ม/พูดเอง
+MAX_JAPANESE_RATIO = float(os.getenv("ROUTER_MAX_JAPANESE_RATIO", "0.05"))
+MIN_CHECK_CHARS = 40   # ต้นฉบับสั้นกว่านี้ไม่ตรวจความยาว (ชื่อตอน / ก้อนสั้นๆ ผันผวนเกินไป)
+PREAMBLE_MAX_CHARS = 160  # บรรทัดเกริ่นเป็นประโยคเดียว บรรทัดยาวกว่านี้ถือเป็นเนื้อหา
+
+JAPANESE = re.compile(r'[぀-ヿ㐀-䶿一-鿿々〆]')
+# คำรับคำสั่ง (+ คำลงท้าย) ตามด้วยวลีสั้นๆ ไม่เกิน ~40 ตัว แล้วจบด้วย ! / "นี่คือ(คำแปล...)" / "แปลแบบ..." / "สรุปเนื้อเรื่อง"
+# เช่น "แน่นอน จัดไปเลย!", "โอเค มาเลย จัดไป! แปลแบบ...", "แน่นอนครับ นี่คือคำแปล...", "เอาล่ะ จัดไป!"
+# คำรับต้องจบคำจริง ("ได้ยิน..." / "แน่นอนว่า..." ในเนื้อเรื่องไม่นับ)
+ACK = r'(?:ยอดเยี่ยม|เยี่ยม|ได้เลย|ได้|แน่นอน|จัดไป|จัดให้|โอเค|มาเลย|เอาล่ะ|เอาเลย)(?:ครับ|ค่ะ|คะ|เลย|จ้า|พี่|เพื่อน|วัยรุ่น|มาก)*(?=[\s!！,])'
+PREAMBLE = re.compile(
+    r'^\s*[*#>\s]*(?:'
+    rf'{ACK}.{{0,40}}?(?:[!！]|นี่คือ|แปลแบบ|สรุปเนื้อเรื่อง)'
+    r'|(?:นี่คือ|ต่อไปนี้(?:คือ|เป็น))(?:คำแปล|ฉบับแปล|การแปล)'
+    r'|.{0,40}(?:แปล|สรุป).{0,30}[:：]\s*$'                 # "คำแปลภาษาไทย:" / "สรุปเนื้อเรื่องตามที่ขอ:"
+    r'|(?:Here(?:\'s| is| are)|Sure|Certainly|Okay)\b)', re.I)
+RULE = re.compile(r'^\s*(?:[-*_=]\s*){3,}$')   # เส้นคั่น --- / *** ที่มักตามหลังคำเกริ่น
+
+
+def price_of(model):
+    custom = os.getenv("GEMINI_PRICE_" + re.sub(r'\W', '_', model).upper())
+    if custom:
+        price_in, price_out = custom.split(",")
+        return float(price_in), float(price_out)
+    return PRICES.get(model, (0.0, 0.0))
+
+
+def japanese_ratio(text):
+    chars = [ch for ch in text or "" if not ch.isspace()]
+    return sum(1 for ch in chars if JAPANESE.match(ch)) / len(chars) if chars else 0.0
+
+
+def is_preamble(line):
+    return len(line.strip()) <= PREAMBLE_MAX_CHARS and bool(PREAMBLE.match(line))
+
+
+def extra_lines(source, output):
+    # คำตอบมีบรรทัดข้อความมากกว่าย่อหน้าต้นฉบับกี่บรรทัด (บรรทัดเกริ่นทำให้เกิน / บทพูด "ได้เลย!" ในเรื่องไม่เกิน)
+    return len(paragraphs(output)) - len(paragraphs(source))
+
+
+def has_preamble(source, output):
+    first = next((line for line in (output or "").split("\n") if line.strip()), "")
+    return is_preamble(first) and extra_lines(source, output) > 0
+
+
+def strip_preamble(source, output):
+    # ตัดบรรทัดเกริ่นต้นข้อความ (+ เส้นคั่น/บรรทัดว่างที่ตามมา) ทิ้ง เท่าที่เกินจำนวนย่อหน้าต้นฉบับ
+    if not has_preamble(source, output): return output
+    extra = extra_lines(source, output)
+    lines = output.split("\n")
+    while lines and extra > 0 and (not lines[0].strip() or is_preamble(lines[0]) or RULE.match(lines[0])):
+        if lines.pop(0).strip(): extra -= 1
+    while lines and not lines[0].strip(): lines.pop(0)
+    return "\n".join(lines) if lines else output
+
+
+def quality_problem(source, output, kind="normal"):
+    # คืนเหตุผลที่ไม่ผ่าน (str) หรือ None -> ตรวจในเครื่องล้วนๆ
+    # kind: "title" / "normal" / "soften" / "summary" (summary สั้นโดยตั้งใจ ไม่ตรวจความยาวขั้นต่ำ)
+    if not output or not output.strip(): return "empty"
+    if has_preamble(source, output): return "preamble"
+    if japanese_ratio(output) > (MAX_JAPANESE_RATIO * 4 if kind == "title" else MAX_JAPANESE_RATIO): return "japanese"
+    if kind != "title" and len(source or "") >= MIN_CHECK_CHARS:
+        ratio = len(output.strip()) / len(source.strip())
+        if ratio > MAX_LENGTH_RATIO: return "too_long"
+        if ratio < MIN_LENGTH_RATIO and kind != "summary": return "too_short"
+    return None
+
+
+class Tier:
+    def __init__(self, name, model):
+        self.name = name
+        self.model = model
+        self.price_in, self.price_out = price_of(model)
+
+    def cost(self, tokens_in, tokens_out):
+        return (tokens_in * self.price_in + tokens_out * self.price_out) / 1_000_000
+
+
+class ModelRouter:
+    # models = [(ชื่อชั้น, โมเดล)] เรียงจากถูก -> แพง (โมเดลซ้ำกันถูกยุบเหลือชั้นเดียว)
+    def __init__(self, models):
+        self.tiers = []
+        for name, model in models:
+            if model and model not in [t.model for t in self.tiers]: self.tiers.append(Tier(name, model))
+        self.models = [t.model for t in self.tiers]
+        self._lock = threading.Lock()
+        self.stats = {t.name: Counter() for t in self.tiers}
+
+    def call(self, tier, generate):
+        # generate(model) -> คำตอบ Gemini จับเวลา/token/ค่าใช้จ่ายของชั้นนั้น
+        start = time.perf_counter()
+        try:
+            res = generate(tier.model)
+        except Exception:
+            with self._lock: self.stats[tier.name]["errors"] += 1
+            raise
+        finally:
+            with self._lock: self.stats[tier.name]["latency_ms"] += int((time.perf_counter() - start) * 1000)
+        tokens = usage_tokens(res)
+        with self._lock:
+            s = self.stats[tier.name]
+            s["calls"] += 1
+            s["prompt_tokens"] += tokens["tokens_in"]
+            s["output_tokens"] += tokens["tokens_out"]
+            s["cost_micro_usd"] += int(tier.cost(tokens["tokens_in"], tokens["tokens_out"]) * 1_000_000)
+        return res
+
+    def accept(self, tier, source, output, kind="normal"):
+        # ผ่าน -> True | ไม่ผ่านแต่ยังมีชั้นถัดไป -> False (นับเป็นการยกชั้น)
+        # นับต่อ "รายการ" ที่ตรวจ ไม่ใช่ต่อครั้งที่เรียก (ชื่อตอนแบบรวม 1 ครั้งตรวจหลายรายการ)
+        # ชั้นสุดท้าย -> True แม้ไม่ผ่านตรวจ (ยกเว้นโดนบล็อก/ว่าง ให้ผู้เรียกไปกลยุทธ์ถัดไป)
+        problem = quality_problem(source, output, kind) if output else "blocked"
+        last = tier is self.tiers[-1]
+        with self._lock:
+            s = self.stats[tier.name]
+            s["checked"] += 1
+            if not problem: s["accepted"] += 1
+            else:
+                s[f"fail_{problem}"] += 1
+                if not last: s["escalated"] += 1
+        if problem and not last:
+            print(f"   ⬆️ {tier.name} ไม่ผ่าน ({problem}) -> ลองโมเดลชั้นถัดไป")
+            report.record("escalate", tier=tier.name, reason=problem, kind=kind, chars=len(source or ""))
+        return not problem or (last and problem != "blocked")
+
+    def summary(self):
+        parts = []
+        with self._lock:
+            for t in self.tiers:
+                s = self.stats[t.name]
+                fails = ", ".join(f"{k[5:]} {v}" for k, v in sorted(s.items()) if k.startswith("fail_"))
+                parts.append(
+                    f"{t.name} ({t.model}): เรียก {s['calls']} ครั้ง | ตรวจ {s['checked']} รายการ: ผ่าน {s['accepted']}"
+                    f" | ยกชั้น {s['escalated']}"
+                    f"{f' ({fails})' if fails else ''} | latency เฉลี่ย {s['latency_ms'] / max(1, s['calls']) / 1000:.2f} วิ"
+                    f" | {s['prompt_tokens']}+{s['output_tokens']} tokens | ~${s['cost_micro_usd'] / 1_000_000:.4f}")
+        return "🧭 Model router:\n   " + "\n   ".join(parts)
+
+    def record(self):
+        # ลง run report (1 แถวต่อชั้น) ต่อจากสรุปของ glossary
+        # seconds=0 เหมือน *_summary อื่น: latency รวมซ้ำกับ stage title/translate อยู่แล้ว ไม่ให้ขึ้นเป็น stage ที่ช้าสุดในตาราง
+        with self._lock:
+            for t in self.tiers:
+                s = dict(self.stats[t.name])
+                report.record("router_summary", 0, tier=t.name, model=t.model,
+                              latency_s=round(s.pop("latency_ms", 0) / 1000, 3),
+                              cost_usd=round(s.pop("cost_micro_usd", 0) / 1_000_000, 6), **s)
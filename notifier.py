@@ -0,0 +1,133 @@
+import queue
+import threading
+import time
+import requests
+from run_report import report
+
+# ==========================================
+# 🔔 แจ้งเตือน Discord: รวมตอนใหม่เป็นข้อความเดียวต่อ webhook + ส่งเบื้องหลัง
+# ==========================================
+# notifier.add(...)    -> แค่จดไว้ (ไม่ยิงทันที)
+# notifier.flush(url)  -> รวมทุกตอนที่จดไว้ของ webhook นั้นเป็นข้อความเดียว แล้วโยนให้ thread ส่ง
+# notifier.close()     -> ส่งที่เหลือทั้งหมด รอ thread ส่งเสร็จ (มีเวลาจำกัด ไม่ค้างทั้งรอบ)
+#
+# ใช้ requests.Session เดียว (keep-alive) มี timeout และเคารพ 429 / retry_after / X-RateLimit-*
+
+POST_TIMEOUT = 10
+MAX_RETRIES = 5
+MAX_EMBEDS = 10           # Discord รับ embed ได้ไม่เกิน 10 อันต่อข้อความ
+EMBED_DESC_LIMIT = 4000   # คำอธิบาย embed ไม่เกิน 4096 ตัวอักษร (เผื่อไว้นิดหน่อย)
+_STOP = object()
+
+
+def single_message(novel_name, ep_title, link):
+    # ตอนเดียว -> ข้อความหน้าตาเดิม
+    return {
+        "content": f"🚨 **ตอนใหม่มาแล้ว!**\n📚 เรื่อง: **{novel_name}**\n📄 ตอน: **{ep_title}**\n\n🔗 ต้นฉบับ: {link}\n✨ *เนื้อหาแปลไทยอัปเดตลงเว็บแล้วครับ!*"
+    }
+
+
+def batch_messages(novels):
+    # novels = {ชื่อเรื่อง: [(ชื่อตอน, ลิงก์)]} -> [payload] (หลายข้อความก็ต่อเมื่อ embed เกิน 10)
+    total = sum(len(eps) for eps in novels.values())
+    if total == 1:
+        name, [(title, link)] = next(iter(novels.items()))
+        return [single_message(name, title, link)]
+
+    embeds = []
+    for name, eps in novels.items():
+        desc = ""
+        for title, link in eps:
+            line = f"📄 [{title}]({link})\n"
+            if desc and len(desc) + len(line) > EMBED_DESC_LIMIT:
+                embeds.append({"title": f"📚 {name}"[:256], "description": desc}); desc = ""
+            desc += line
+        if desc: embeds.append({"title": f"📚 {name}"[:256], "description": desc})
+
+    header = f"🚨 **ตอนใหม่มาแล้ว {total} ตอน!**\n✨ *เนื้อหาแปลไทยอัปเดตลงเว็บแล้วครับ!*"
+    messages = [{"embeds": embeds[i:i + MAX_EMBEDS]} for i in range(0, len(embeds), MAX_EMBEDS)]
+    messages[0]["content"] = header
+    return messages
+
+
+class DiscordNotifier:
+    def __init__(self, session=None, timeout=POST_TIMEOUT, max_retries=MAX_RETRIES):
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._pending = {}        # webhook -> {ชื่อเรื่อง: [(ชื่อตอน, ลิงก์)]}
+        self._blocked_until = {}  # webhook -> เวลาที่ bucket ของ Discord ว่างอีกครั้ง
+        self._queue = queue.Queue()
+        self._thread = None
+        self.sent = self.failed = 0
+
+    def add(self, webhook_url, novel_name, ep_title, link):
+        if not webhook_url: return
+        with self._lock:
+            self._pending.setdefault(webhook_url, {}).setdefault(novel_name, []).append((ep_title, link))
+
+    def flush(self, webhook_url=None):
+        with self._lock:
+            urls = [webhook_url] if webhook_url else list(self._pending)
+            batches = [(url, self._pending.pop(url)) for url in urls if url in self._pending]
+        for url, novels in batches:
+            for payload in batch_messages(novels): self._submit(url, payload)
+
+    def close(self, timeout=60):
+        self.flush()
+        if not self._thread: return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive(): print("⚠️ ส่งแจ้งเตือน Discord ไม่ทันเวลา -> ข้ามที่เหลือ")
+        self.session.close()
+
+    def summary(self):
+        return f"🔔 Discord: ส่ง {self.sent} ข้อความ | ไม่สำเร็จ {self.failed}"
+
+    # ---------- thread ส่ง ----------
+
+    def _submit(self, url, payload):
+        with self._lock:
+            if not self._thread:
+                self._thread = threading.Thread(target=self._worker, name="discord", daemon=True)
+                self._thread.start()
+        self._queue.put((url, payload))
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP: return
+            url, payload = item
+            ok = self._post(url, payload)
+            if ok: self.sent += 1
+            else: self.failed += 1
+
+    def _post(self, url, payload):
+        for attempt in range(self.max_retries):
+            wait = self._blocked_until.get(url, 0) - time.monotonic()
+            if wait > 0: time.sleep(wait)
+            try:
+                with report.stage("notify", attempt=attempt) as ev:
+                    r = self.session.post(url, json=payload, timeout=self.timeout)
+                    ev["status"] = r.status_code
+            except requests.RequestException as e:
+                print(f"   ⚠️ Discord error: {e}")
+                time.sleep(min(30, 2 ** attempt)); continue
+
+            # bucket ใกล้หมด -> รอให้รีเซ็ตก่อนส่งข้อความถัดไปไป webhook เดิม
+            if r.headers.get("X-RateLimit-Remaining") == "0":
+                reset = float(r.headers.get("X-RateLimit-Reset-After") or 1)
+                self._blocked_until[url] = time.monotonic() + reset
+            if r.status_code == 429:
+                try: retry_after = float(r.json().get("retry_after", 1))
+                except ValueError: retry_after = float(r.headers.get("Retry-After") or 1)
+                print(f"   ⏳ Discord 429 -> รอ {retry_after:.1f} วิ")
+                self._blocked_until[url] = time.monotonic() + retry_after
+                continue
+            if r.status_code >= 500:
+                time.sleep(min(30, 2 ** attempt)); continue
+            if r.status_code >= 400:
+                print(f"   ❌ Discord ตอบ {r.status_code}: {r.text[:200]}"); return False
+            return True
+        return False
@@ -0,0 +1,209 @@
+import json
+import os
+import re
+import threading
+
+# ==========================================
+# 🗄️ คลังตอนนิยายแบบแยกไฟล์ (แทนการเขียน novels.json ทั้งก้อนทุกตอน)
+# ==========================================
+#
+# data/index.json                    -> ลำดับเรื่อง (novel_url)
+# data/<work_id>/novel.json          -> ชื่อเรื่อง + สารบัญ (ไม่มีเนื้อหา)
+# data/<work_id>/chapters/<ep>.json  -> เนื้อหาแต่ละตอน
+# data/<work_id>/episodes.json       -> ลำดับตอนทั้งเรื่อง + ลิงก์ตอนถัดไป (จากหน้าสารบัญ)
+# data/<work_id>/<name>.json         -> สถานะอื่นๆ ของบอท (load_state / save_state)
+#
+# novels.json ยังส่งออกได้ด้วย export_json() ให้ index.html ใช้เหมือนเดิม
+
+DATA_DIR = "data"
+JSON_DB_FILE = "novels.json"
+
+
+def work_id_of(novel_url):
+    m = re.search(r'/works/(\d+)', novel_url)
+    return m.group(1) if m else re.sub(r'\W+', '_', novel_url)
+
+
+def atomic_write_json(path, obj, indent=4):
+    # เขียนลงไฟล์ชั่วคราวก่อนแล้วค่อยสลับ -> ไฟล์ไม่มีทางค้างครึ่งๆ กลางๆ
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp, path)
+
+
+def read_json(path, default=None):
+    if not os.path.exists(path): return default
+    try:
+        with open(path, "r", encoding="utf-8") as f: return json.load(f)
+    except: return default
+
+
+class NovelStore:
+    def __init__(self, root=DATA_DIR, legacy_json=JSON_DB_FILE, flush_every=10):
+        self.root = root
+        self.legacy_json = legacy_json
+        self.flush_every = max(1, flush_every)
+        self._lock = threading.RLock()
+        self._novels = {}        # novel_url -> {"url", "title", "chapters": [meta...]}
+        self._link_index = {}    # novel_url -> {link: ตำแหน่งใน chapters}
+        self._contents = {}      # (novel_url, ep_id) -> ep_data ที่ยังไม่ได้ flush
+        self._dirty_novels = set()
+        self._order = read_json(os.path.join(root, "index.json"), [])
+        self._pending = 0
+        if not os.path.isdir(root) and legacy_json and os.path.exists(legacy_json):
+            self.migrate_from_json(legacy_json)
+
+    # ---------- path helpers ----------
+
+    def _novel_dir(self, novel_url):
+        return os.path.join(self.root, work_id_of(novel_url))
+
+    def _index_path(self, novel_url):
+        return os.path.join(self._novel_dir(novel_url), "novel.json")
+
+    def _chapter_path(self, novel_url, ep_id):
+        return os.path.join(self._novel_dir(novel_url), "chapters", f"{ep_id}.json")
+
+    # ---------- load ----------
+
+    def novel_urls(self):
+        with self._lock: return list(self._order)
+
+    def _load(self, novel_url):
+        if novel_url in self._novels: return self._novels[novel_url]
+        novel = read_json(self._index_path(novel_url)) or {"url": novel_url, "title": "", "chapters": []}
+        self._novels[novel_url] = novel
+        self._link_index[novel_url] = {c["link"]: i for i, c in enumerate(novel["chapters"])}
+        return novel
+
+    def title(self, novel_url):
+        with self._lock: return self._load(novel_url).get("title", "")
+
+    def chapters(self, novel_url):
+        # สารบัญ (ep_id / title / link) ไม่โหลดเนื้อหา
+        with self._lock: return [dict(c) for c in self._load(novel_url)["chapters"]]
+
+    def has_link(self, novel_url, link):
+        with self._lock:
+            self._load(novel_url)
+            return link in self._link_index[novel_url]
+
+    def get_chapter(self, novel_url, link):
+        with self._lock:
+            self._load(novel_url)
+            idx = self._link_index[novel_url].get(link)
+            if idx is None: return None
+            ep_id = self._novels[novel_url]["chapters"][idx]["ep_id"]
+            cached = self._contents.get((novel_url, ep_id))
+            if cached: return dict(cached)
+            return read_json(self._chapter_path(novel_url, ep_id))
+
+    # ---------- write ----------
+
+    def upsert(self, novel_url, novel_title, ep_data):
+        with self._lock:
+            novel = self._load(novel_url)
+            if novel_url not in self._order: self._order.append(novel_url)
+            if novel_title: novel["title"] = novel_title
+            meta = {"ep_id": str(ep_data["ep_id"]), "title": ep_data["title"], "link": ep_data["link"]}
+            links = self._link_index[novel_url]
+            idx = links.get(ep_data["link"])
+            if idx is not None:
+                old_ep = novel["chapters"][idx]["ep_id"]
+                if old_ep != meta["ep_id"]: self._contents.pop((novel_url, old_ep), None)
+                novel["chapters"][idx] = meta
+            else:
+                links[ep_data["link"]] = len(novel["chapters"])
+                novel["chapters"].append(meta)
+            self._contents[(novel_url, meta["ep_id"])] = dict(ep_data, ep_id=meta["ep_id"])
+            self._dirty_novels.add(novel_url)
+            self._pending += 1
+            if self._pending >= self.flush_every: self.flush()
+
+    def set_title(self, novel_url, novel_title):
+        with self._lock:
+            self._load(novel_url)["title"] = novel_title
+            if novel_url not in self._order: self._order.append(novel_url)
+            self._dirty_novels.add(novel_url)
+
+    def flush(self):
+        with self._lock:
+            for (novel_url, ep_id), ep_data in self._contents.items():
+                atomic_write_json(self._chapter_path(novel_url, ep_id), ep_data)
+            for novel_url in self._dirty_novels:
+                atomic_write_json(self._index_path(novel_url), self._novels[novel_url])
+            if self._dirty_novels:
+                atomic_write_json(os.path.join(self.root, "index.json"), self._order)
+            self._contents.clear()
+            self._dirty_novels.clear()
+            self._pending = 0
+
+    # ---------- episode chain ----------
+
+    def _chain_path(self, novel_url):
+        return os.path.join(self._novel_dir(novel_url), "episodes.json")
+
+    def episode_chain(self, novel_url):
+        with self._lock: return read_json(self._chain_path(novel_url), [])
+
+    def merge_episode_chain(self, novel_url, episodes):
+        # รวมลิสต์ตอนจากสารบัญเข้ากับที่เก็บไว้ (จำ next_link เดิมไว้) แล้วเรียงตาม ep_id
+        with self._lock:
+            chain = {e["link"]: e for e in self.episode_chain(novel_url)}
+            for ep in episodes:
+                old = chain.get(ep["link"], {})
+                chain[ep["link"]] = dict(old, **{k: v for k, v in ep.items() if v})
+            merged = sorted(chain.values(), key=lambda e: int(e["ep_id"]))
+            for cur, nxt in zip(merged, merged[1:]):
+                cur.setdefault("next_link", nxt["link"])
+            atomic_write_json(self._chain_path(novel_url), merged)
+            return merged
+
+    def set_next_link(self, novel_url, link, next_link, ep_id=None, title=None):
+        with self._lock:
+            ep = {"ep_id": str(ep_id) if ep_id else None, "link": link, "title": title, "next_link": next_link}
+            if not ep["ep_id"]:
+                ep["ep_id"] = next((e["ep_id"] for e in self.episode_chain(novel_url) if e["link"] == link), None)
+            if ep["ep_id"]: self.merge_episode_chain(novel_url, [ep])
+
+    # ---------- state ----------
+
+    def load_state(self, novel_url, name, default=None):
+        with self._lock:
+            return read_json(os.path.join(self._novel_dir(novel_url), f"{name}.json"), default)
+
+    def save_state(self, novel_url, name, obj):
+        with self._lock:
+            atomic_write_json(os.path.join(self._novel_dir(novel_url), f"{name}.json"), obj)
+
+    # ---------- compat ----------
+
+    def export_json(self, path=None):
+        # สร้าง novels.json หน้าตาเดิม { novel_url: {title, chapters:[{ep_id,title,content,link}]} }
+        path = path or self.legacy_json
+        with self._lock:
+            self.flush()
+            data = {}
+            for novel_url in self.novel_urls():
+                novel = self._load(novel_url)
+                chapters = []
+                for meta in novel["chapters"]:
+                    ep = read_json(self._chapter_path(novel_url, meta["ep_id"])) or {}
+                    chapters.append({"ep_id": meta["ep_id"], "title": meta["title"],
+                                     "content": ep.get("content", ""), "link": meta["link"]})
+                data[novel_url] = {"title": novel.get("title", ""), "chapters": chapters}
+            atomic_write_json(path, data)
+            print(f"💾 ส่งออก {path} แล้ว ({len(data)} เรื่อง)")
+
+    def migrate_from_json(self, path):
+        data = read_json(path, {})
+        if not isinstance(data, dict): return
+        print(f"📦 ย้ายข้อมูลจาก {path} -> {self.root}/ ...")
+        with self._lock:
+            for novel_url, novel in data.items():
+                for ep in novel.get("chapters", []):
+                    self.upsert(novel_url, novel.get("title", ""), ep)
+                self.set_title(novel_url, novel.get("title", ""))
+            self.flush()
@@ -0,0 +1,41 @@
+import threading
+import time
+from urllib.parse import urlparse
+from run_report import report
+
+# ==========================================
+# 🚦 ตัวคุมจังหวะการยิง request (ใช้ร่วมกันทุก thread)
+# ==========================================
+
+class HostLimiter:
+    # เว้นระยะขั้นต่ำระหว่าง request ที่ไปโฮสต์เดียวกัน (มารยาทกับ kakuyomu.jp)
+    def __init__(self, min_interval=2.0):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0))
+            self._next_slot[host] = slot + self.min_interval
+        # จองคิวไว้แล้วค่อยนอนนอก lock เพื่อไม่ให้ thread อื่นต่อคิวช้าลง
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+            report.record("sleep", delay, host=host)
+
+
+class ConcurrencyCap:
+    # จำกัดจำนวนงานที่ทำพร้อมกัน (เช่น เรียก Gemini ได้ทีละไม่เกิน N)
+    def __init__(self, limit):
+        self._sem = threading.BoundedSemaphore(max(1, limit))
+
+    def __enter__(self):
+        self._sem.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self._sem.release()
+        return False
@@ -0,0 +1,108 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+# ==========================================
+# 📊 บันทึกเวลาแต่ละขั้น + token ต่อการเรียก -> รายงานท้ายรอบ
+# ==========================================
+# ขั้นที่วัด: fetch / parse / sleep (รอคิว kakuyomu) / translate (ทุกครั้งที่ลอง + กลยุทธ์ที่ใช้)
+#            title / throttle / backoff (Gemini) / save / notify
+#
+# ตอนจบรอบเขียน reports/<ชื่อสคริปต์>-<เวลา>.jsonl (1 บรรทัด = 1 เหตุการณ์) + .md (ตารางสรุป)
+# ถ้ารันบน GitHub Actions ตารางจะถูกต่อท้าย Job Summary ด้วย
+
+REPORT_DIR = os.getenv("RUN_REPORT_DIR", "reports")
+
+
+def usage_tokens(res):
+    # token เข้า/ออกจาก usage_metadata ของคำตอบ (ไม่มีก็เป็น 0)
+    usage = getattr(res, "usage_metadata", None)
+    return {
+        "tokens_in": getattr(usage, "prompt_token_count", None) or 0,
+        "tokens_out": getattr(usage, "candidates_token_count", None) or 0,
+        "tokens_cached": getattr(usage, "cached_content_token_count", None) or 0,
+    }
+
+
+def _p95(values):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * 0.95))] if values else 0.0
+
+
+class RunReport:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.events = []
+        self.started = time.time()
+
+    def record(self, stage, seconds=0.0, **fields):
+        event = {"stage": stage, "seconds": round(seconds, 4), "at": round(time.time() - self.started, 3),
+                 "thread": threading.current_thread().name}
+        event.update(fields)
+        with self._lock: self.events.append(event)
+
+    @contextlib.contextmanager
+    def stage(self, stage, **fields):
+        # with report.stage("fetch", url=url) as ev: ... ev["status"] = r.status_code
+        start = time.perf_counter()
+        try:
+            yield fields
+        except Exception as e:
+            fields["error"] = str(e)[:200]
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - start, **fields)
+
+    def summary(self):
+        groups = {}
+        with self._lock: events = list(self.events)
+        for ev in events: groups.setdefault(ev["stage"], []).append(ev)
+        rows = []
+        for stage, evs in groups.items():
+            secs = [e["seconds"] for e in evs]
+            rows.append({
+                "stage": stage,
+                "count": len(evs),
+                "total_s": round(sum(secs), 2),
+                "mean_s": round(sum(secs) / len(secs), 3),
+                "p95_s": round(_p95(secs), 3),
+                "max_s": round(max(secs), 3),
+                "tokens_in": sum(e.get("tokens_in", 0) for e in evs),
+                "tokens_out": sum(e.get("tokens_out", 0) for e in evs),
+                "tokens_cached": sum(e.get("tokens_cached", 0) for e in evs),
+                "errors": sum(1 for e in evs if e.get("error")),
+            })
+        return sorted(rows, key=lambda r: -r["total_s"])
+
+    def table(self):
+        rows = self.summary()
+        cols = ["stage", "count", "total_s", "mean_s", "p95_s", "max_s", "tokens_in", "tokens_out", "tokens_cached", "errors"]
+        lines = ["| " + " | ".join(cols) + " |", "|" + "---|" * len(cols)]
+        lines += ["| " + " | ".join(str(r[c]) for c in cols) + " |" for r in rows]
+        lines.append(f"\nเวลารวมทั้งรอบ {time.time() - self.started:.1f} วินาที (ขั้นต่างๆ ทำซ้อนกันได้ ผลรวมจึงเกินเวลาจริง)")
+        return "\n".join(lines)
+
+    def write(self, name, out_dir=REPORT_DIR):
+        os.makedirs(out_dir, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        base = os.path.join(out_dir, f"{name}-{stamp}")
+        with self._lock: events = list(self.events)
+        with open(base + ".jsonl", "w", encoding="utf-8") as f:
+            for ev in events: f.write(json.dumps(ev, ensure_ascii=False) + "\n")
+            for row in self.summary(): f.write(json.dumps(dict(row, summary=True), ensure_ascii=False) + "\n")
+
+        table = self.table()
+        with open(base + ".md", "w", encoding="utf-8") as f: f.write(f"## 📊 {name}\n\n{table}\n")
+        step_summary = os.getenv("GITHUB_STEP_SUMMARY")
+        if step_summary:
+            with open(step_summary, "a", encoding="utf-8") as f: f.write(f"## 📊 {name}\n\n{table}\n")
+        print(f"📊 รายงานรอบนี้: {base}.jsonl")
+        print(table)
+        return base
+
+
+# ตัวเดียวใช้ร่วมกันทั้ง process (ทุก thread บันทึกลงที่เดียวกัน)
+report = RunReport()
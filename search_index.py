@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import unicodedata
+from novel_store import read_json
+
+# ==========================================
+# 🔍 ดัชนีค้นหาแบบ character n-gram (ภาษาไทยไม่มีช่องว่างระหว่างคำ)
+# ==========================================
+# site/search/<work_id>/meta.json  -> {"n", "buckets", "docs": {ep_id: {"i": เลขเอกสาร, "h": hash เนื้อหา, "b": ถังที่ใช้ (hex bitmask)}}}
+# site/search/<work_id>/<k>.json   -> {gram: [เลขเอกสาร, จำนวนครั้ง, เลขเอกสาร, จำนวนครั้ง, ...]} เฉพาะ gram ที่ตกถัง k
+#
+# หน้าเว็บค้นคำไหน -> คำนวณ gram + ถังแบบเดียวกัน (ดู index.html) แล้วโหลดแค่ถังที่ต้องใช้
+# อัปเดตทีละตอน: ตอนที่เนื้อหาไม่เปลี่ยน (hash เท่าเดิม) ไม่ถูกตัดคำใหม่ เขียนเฉพาะถังที่เปลี่ยน
+
+NGRAM = 2
+BUCKETS = 64
+
+
+def normalize(text):
+    # ตัดช่องว่าง/เครื่องหมาย/สัญลักษณ์ทิ้ง (index.html ใช้ /[\p{P}\p{Z}\p{S}\p{C}]/gu แบบเดียวกัน)
+    return "".join(ch for ch in (text or "").lower() if unicodedata.category(ch)[0] not in "PZSC")
+
+
+def ngrams(text, n=NGRAM):
+    text = normalize(text)
+    counts = {}
+    for i in range(len(text) - n + 1):
+        gram = text[i:i + n]
+        counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+def bucket_of(gram, buckets=BUCKETS):
+    # hash แบบ 31*h + code point (32 บิต) -> คำนวณใน JavaScript ได้ตรงกัน
+    h = 0
+    for ch in gram: h = (h * 31 + ord(ch)) & 0xFFFFFFFF
+    return h % buckets
+
+
+def _dump(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+class SearchIndex:
+    # write(path, raw_bytes) -> ใช้ build_site.write_compressed (เขียนเฉพาะที่เปลี่ยน + .gz/.br)
+    def __init__(self, out_dir, write):
+        self.out_dir = out_dir
+        self.write = write
+
+    def _dir(self, work_id):
+        return os.path.join(self.out_dir, "search", work_id)
+
+    def update_novel(self, work_id, docs):
+        # docs = {ep_id: ข้อความ (ชื่อตอน + เนื้อหา)} ทั้งเรื่อง -> คืนจำนวนตอนที่ถูกทำดัชนีใหม่
+        meta_path = os.path.join(self._dir(work_id), "meta.json")
+        meta = read_json(meta_path) or {}
+        if meta.get("n") != NGRAM or meta.get("buckets") != BUCKETS:
+            meta = {"n": NGRAM, "buckets": BUCKETS, "docs": {}}
+        old_docs = meta["docs"]
+
+        hashes = {ep: hashlib.sha1(text.encode("utf-8")).hexdigest()[:16] for ep, text in docs.items()}
+        changed = [ep for ep, h in hashes.items() if old_docs.get(ep, {}).get("h") != h]
+        removed = [ep for ep in old_docs if ep not in docs]
+        if not changed and not removed: return 0
+
+        # ถังที่ต้องแก้ = ถังเดิมของตอนที่เปลี่ยน/ลบ + ถังของ gram ใหม่
+        stale = set(changed) | set(removed)
+        touched = set()
+        for ep in stale:
+            mask = int(old_docs.get(ep, {}).get("b", "0"), 16)
+            touched |= {k for k in range(BUCKETS) if mask >> k & 1}
+        fresh = {}
+        for ep in changed:
+            grams = ngrams(docs[ep])
+            fresh[ep] = grams
+            touched |= {bucket_of(g) for g in grams}
+
+        # ในถังเก็บเลขเอกสารสั้นๆ แทน ep_id ยาว 19 หลัก (ตอนเดิมใช้เลขเดิมตลอด)
+        stale_ids = {old_docs[ep]["i"] for ep in stale if ep in old_docs}
+        shards = {}
+        for k in touched:
+            flat = read_json(os.path.join(self._dir(work_id), f"{k}.json"), {})
+            shards[k] = {gram: {doc: cnt for doc, cnt in zip(p[::2], p[1::2]) if doc not in stale_ids}
+                         for gram, p in flat.items()}
+        next_id = max((d["i"] for d in old_docs.values()), default=-1) + 1
+        for ep, grams in fresh.items():
+            if ep in old_docs: doc = old_docs[ep]["i"]
+            else: doc, next_id = next_id, next_id + 1
+            mask = 0
+            for gram, count in grams.items():
+                k = bucket_of(gram)
+                shards[k].setdefault(gram, {})[doc] = count
+                mask |= 1 << k
+            old_docs[ep] = {"i": doc, "h": hashes[ep], "b": format(mask, "x")}
+        for ep in removed: old_docs.pop(ep, None)
+
+        for k, shard in shards.items():
+            flat = {gram: [x for doc in sorted(p) for x in (doc, p[doc])] for gram, p in shard.items() if p}
+            self.write(os.path.join(self._dir(work_id), f"{k}.json"), _dump(flat))
+        self.write(meta_path, _dump(meta))
+        return len(changed) + len(removed)
@@ -0,0 +1,35 @@
+import hashlib
+
+# ==========================================
+# 🧩 segments: ย่อหน้าต้นฉบับ -> ช่วงบรรทัดในคำแปล (ไว้แปลใหม่เฉพาะย่อหน้าที่ผู้แต่งแก้)
+# ==========================================
+# แยกจาก translator.py (ไม่พึ่ง google.genai) -> check_novel เทียบ hash ต้นฉบับได้โดยไม่ต้องโหลดระบบแปล
+# [{"src": [hash ย่อหน้า...], "n": จำนวนบรรทัดใน content}] เรียงตามลำดับ ผลรวม n = จำนวนบรรทัดทั้งหมด
+# จำนวนบรรทัดที่มีข้อความตรงกับจำนวนย่อหน้า -> 1 ย่อหน้า / 1 segment ไม่ตรง -> ทั้งก้อนเป็น segment เดียว
+# is_failed อยู่ที่นี่ด้วย (เช็คข้อความล้วนๆ) -> check_novel ใช้ได้ก่อนโหลด translator
+
+
+def is_failed(text):
+    return bool(text) and "⚠️" in text and "ไม่สามารถแปลได้" in text
+
+
+def source_hash(text):
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()[:16]
+
+
+def paragraphs(text):
+    return [p for p in (text or "").split("\n") if p.strip()]
+
+
+def paragraph_hash(para):
+    return hashlib.sha1(para.strip().encode("utf-8")).hexdigest()[:12]
+
+
+def align_segments(source, thai):
+    src = [paragraph_hash(p) for p in paragraphs(source)]
+    lines = thai.split("\n")
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    if not src or len(filled) != len(src):
+        return [{"src": src, "n": len(lines)}]
+    bounds = [0] + filled[1:] + [len(lines)]
+    return [{"src": [h], "n": bounds[k + 1] - bounds[k]} for k, h in enumerate(src)]
@@ -0,0 +1,79 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_router import ModelRouter, is_preamble, quality_problem, strip_preamble
+from run_report import report
+
+# บรรทัดแรกของตอนที่หลุดลง novels.json จริง
+LEAKED = [
+    "เยี่ยมเลย! จัดไปแบบสำนวนวัยรุ่น อ่านง่าย เข้าใจฟีลลิ่งคนแปล",
+    "แน่นอน จัดไปเลย!",
+    "แน่นอน จัดให้เลยครับ!",
+    "แน่นอน จัดไปเลย! นี่คือคำแปลนิยายตามที่คุณต้องการ ในสำนวนวัยรุ่น",
+    "โอเค จัดไป! แปลแบบได้ฟีลวัยรุ่นไลท์โนเวลเต็มๆ ครับ",
+    "โอเค มาเลย จัดไป! แปลแบบให้ได้ฟีลวัยรุ่นหัวร้อนนิดๆ นะ",
+    "โอเคเลย มาจัดให้แบบถึงเครื่อง! แปลสำนวนวัยรุ่นให้สะใจไปเลย!",
+    "แน่นอน! จัดให้เลยครับ แปลแบบเอาใจวัยรุ่น อ่านลื่นปรื๊ดๆ",
+    "แน่นอนครับ นี่คือคำแปลที่ปรับเนื้อหาให้ดูเป็นธรรมชาติและหลีกเลี่ยงคำที่อาจจะล่อแหลม",
+    "แน่นอนค่ะ นี่คือฉบับแปลที่ปรับให้มีความนุ่มนวลและหลีกเลี่ยงคำที่ล่อแหลม",
+    "แน่นอนครับ นี่คือสรุปเนื้อเรื่องฉบับ All Ages ครับ",
+    "ยอดเยี่ยมเลยครับ สรุปเนื้อเรื่องฉบับ All Ages ตามที่คุณต้องการ",
+    "ยอดเยี่ยมเลยครับ! การแปลนิยายโดยใช้สำนวนวัยรุ่นเป็นอะไรที่สนุกมาก",
+    "จัดไปเลยวัยรุ่น!",
+    "จัดไปเลยวัยรุ่น! แปลแบบโคตรตี้ โคตรจะโบ๊ะบ๊ะ",
+    "เอาล่ะ จัดไป! แปลแบบได้ฟีลวัยรุ่น ไลท์โนเวลจ๋าๆ เลยนะ",
+    "เอาเลยเพื่อน จัดไป! แปลแบบได้ฟีลวัยรุ่นจีบกันใหม่ๆ อารมณ์มาเต็มแน่นอน",
+    "ได้เลยครับ นี่คือคำแปลฉบับเลี่ยงคำล่อแหลมและรุนแรงครับ",
+    "สรุปเนื้อเรื่องตามที่ขอ:",
+]
+
+# บรรทัดแรกที่เป็นเนื้อเรื่องจริงใน novels.json
+STORY = [
+    "และด้วยเหตุผลพรรค์นั้นแหละ",
+    "เชี่ยเอ๊ย, เสือกมาขวางอยู่ได้... ไอ้จืดนั่นมันใครวะ!",
+    "\"มาอยู่ด้วยกันกับฉันนะคะ\"",
+    "「โคลเอ้จังผิวสวยจริง ๆ เนอะ」",
+    "แน่นอนว่าเธอไม่รู้เรื่องนี้",
+    "ได้ยินเสียงฝีเท้าดังมาจากทางเดิน!",
+    "นี่คือห้องของฉัน",
+]
+
+SOURCE = "今日は晴れです。\n\n明日は雨です。"
+
+
+def test_leaked_preambles_detected():
+    for line in LEAKED:
+        assert is_preamble(line), line
+
+
+def test_story_lines_not_preamble():
+    for line in STORY:
+        assert not is_preamble(line), line
+
+
+def test_strip_preamble_and_rule():
+    out = "แน่นอน จัดไปเลย! นี่คือคำแปลในสไตล์วัยรุ่น\n\n---\n\nวันนี้อากาศดีมากเลยครับ\n\nพรุ่งนี้ฝนตกนะ"
+    assert quality_problem(SOURCE, out) == "preamble"
+    assert strip_preamble(SOURCE, out) == "วันนี้อากาศดีมากเลยครับ\n\nพรุ่งนี้ฝนตกนะ"
+
+
+def test_dialogue_matching_pattern_kept_when_no_extra_line():
+    # "เอาล่ะ!" เป็นบทพูดจริง จำนวนบรรทัดเท่าย่อหน้าต้นฉบับ -> ไม่ใช่คำเกริ่น
+    out = "เอาล่ะ! ถึงเวลาออกโรงแล้ว!\n\nพรุ่งนี้ฝนตกนะครับผม"
+    assert quality_problem(SOURCE, out) is None
+    assert strip_preamble(SOURCE, out) == out
+
+
+def test_batch_title_accepts_counted_per_item_and_recorded_without_seconds():
+    router = ModelRouter([("fast", "fast-model"), ("strong", "strong-model")])
+    fast = router.tiers[0]
+    router.call(fast, lambda model: None)   # ชื่อตอนแบบรวม: เรียก 1 ครั้ง ตรวจ 3 รายการ
+    for title in ("ตอนที่ 1", "ตอนที่ 2", "ตอนที่ 3"):
+        assert router.accept(fast, "第1話", title, "title")
+    assert "เรียก 1 ครั้ง | ตรวจ 3 รายการ: ผ่าน 3" in router.summary()
+
+    router.record()
+    row = [e for e in report.events if e["stage"] == "router_summary" and e["tier"] == "fast"][-1]
+    assert row["seconds"] == 0 and "latency_s" in row
+    assert (row["calls"], row["checked"], row["accepted"]) == (1, 3, 3)
@@ -0,0 +1,116 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from segments import align_segments, paragraphs
+from translator import CHUNK_CHARS, Translator
+
+
+class FakeTranslator(Translator):
+    # แปลทีละย่อหน้าแบบตายตัว คั่นด้วยบรรทัดว่างเหมือนที่ Gemini ตอบจริง -> ผลเทียบกันได้ทุกตัวอักษร
+    def __init__(self):
+        super().__init__(object(), "fake-model")
+        self.calls = []
+
+    def translate_chunk(self, text, novel=None, start=0):
+        self.calls.append(text)
+        return "\n\n".join(f"ไทย<{p}>" for p in paragraphs(text))
+
+
+def source_of(n, size=20):
+    return "\n".join(f"{i}番目の段落。" + "あ" * size for i in range(n))
+
+
+def line_count(segments):
+    return sum(s["n"] for s in segments)
+
+
+def test_align_segments_one_per_paragraph_or_whole_block():
+    source = "一。\n二。\n三。"
+    thai = "หนึ่ง\n\nสอง\n\nสาม"
+    segments = align_segments(source, thai)
+    assert [s["n"] for s in segments] == [2, 2, 1]
+    assert line_count(segments) == len(thai.split("\n"))
+    # จำนวนบรรทัดไม่ตรงจำนวนย่อหน้า -> ทั้งก้อนเป็น segment เดียว
+    merged = align_segments(source, "หนึ่ง สอง\n\nสาม")
+    assert len(merged) == 1 and len(merged[0]["src"]) == 3 and merged[0]["n"] == 3
+
+
+def test_segments_cover_every_line_across_chunks():
+    t = FakeTranslator()
+    source = source_of(300)
+    assert len(source) > CHUNK_CHARS
+    content, segments, err = t.translate_segments(source)
+    assert err is None and len(t.calls) > 1
+    assert line_count(segments) == len(content.split("\n"))
+    assert len(segments) == len(paragraphs(source))
+
+
+def test_revise_unchanged_source_is_identical():
+    t = FakeTranslator()
+    source = source_of(300)
+    content, segments, _ = t.translate_segments(source)
+    t.calls.clear()
+    revised, new_segments, blocks = t.revise(content, segments, source)
+    assert revised == content and new_segments == segments
+    assert blocks == 0 and t.calls == []
+
+
+def test_revise_one_paragraph_matches_full_retranslation():
+    t = FakeTranslator()
+    old = source_of(300)
+    content, segments, _ = t.translate_segments(old)
+    for k in (0, 150, 299):
+        paras = paragraphs(old)
+        paras[k] = "書き直した段落。"
+        new = "\n".join(paras)
+        t.calls.clear()
+        revised, new_segments, blocks = t.revise(content, segments, new)
+        assert blocks == 1 and t.calls == ["書き直した段落。"]
+        full, full_segments, _ = t.translate_segments(new)
+        assert revised == full
+        assert line_count(new_segments) == len(revised.split("\n"))
+
+
+def test_revise_inserted_and_appended_paragraphs():
+    t = FakeTranslator()
+    old = source_of(10)
+    content, segments, _ = t.translate_segments(old)
+    paras = paragraphs(old)
+    new = "\n".join(paras[:4] + ["追加。"] + paras[4:] + ["最後。"])
+    revised, new_segments, blocks = t.revise(content, segments, new)
+    assert blocks == 2
+    assert revised == t.translate_segments(new)[0]
+    assert line_count(new_segments) == len(revised.split("\n"))
+
+
+def test_revise_deleted_paragraphs_keep_old_translation():
+    t = FakeTranslator()
+    old = source_of(10)
+    content, segments, _ = t.translate_segments(old)
+    paras = paragraphs(old)
+    new = "\n".join(paras[:3] + paras[4:-1])
+    t.calls.clear()
+    revised, new_segments, blocks = t.revise(content, segments, new)
+    assert blocks == 0 and t.calls == []
+    assert revised == t.translate_segments(new)[0]
+    assert line_count(new_segments) == len(revised.split("\n"))
+
+
+def test_revise_whole_block_segment_retranslated_together():
+    # ก้อนที่บรรทัดไม่ตรงย่อหน้า (segment เดียวทั้งก้อน) แก้ย่อหน้าเดียว -> แปลใหม่ทั้งก้อนในครั้งเดียว
+    t = FakeTranslator()
+    source = "一。\n二。\n三。"
+    content = "หนึ่ง สอง\n\nสาม"
+    segments = align_segments(source, content)
+    revised, new_segments, blocks = t.revise(content, segments, "一。\n二!\n三。")
+    assert blocks == 1 and t.calls == ["一。\n二!\n三。"]
+    assert revised == "ไทย<一。>\n\nไทย<二!>\n\nไทย<三。>"
+    assert line_count(new_segments) == len(revised.split("\n"))
+
+
+def test_revise_rejects_segments_that_do_not_cover_content():
+    t = FakeTranslator()
+    content, segments, _ = t.translate_segments(source_of(5))
+    assert t.revise(content + "\nเพิ่ม", segments, source_of(5)) is None
+    assert t.revise(content, [], source_of(5)) is None
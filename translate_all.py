@@ -1,24 +1,45 @@
 from google import genai
-from google.genai import types
 import cloudscraper
-import requests
-from bs4 import BeautifulSoup
 import time
 import os
-import re
-import random
-import json
-from urllib.parse import urljoin
+import queue
+import threading
+from novel_store import NovelStore, DATA_DIR, atomic_write_json, read_json, work_id_of
+from translation_cache import TranslationCache
+from translator import build_translator, report_summaries, is_failed
+from segments import source_hash
+from run_report import report
+from rate_limit import HostLimiter, ConcurrencyCap
+from kakuyomu import parse_episode, parse_toc
 
 # ==========================================
 # ⚙️ ส่วนตั้งค่า
 # ==========================================
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") 
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", 'gemini-2.5-pro')   # ชั้น strong (ชั้น fast = GEMINI_FAST_MODEL ใน model_router.py)
 NOVEL_MAIN_URL = "https://kakuyomu.jp/works/16817330667405194673"
 
 JSON_DB_FILE = "novels.json"
 HISTORY_FILE = "history_novel_5.txt"
 
+# 📚 หลายเรื่อง: works.json = [{"url": ..., "history_file": ...}] (ไม่มีไฟล์ -> ใช้ NOVEL_MAIN_URL เรื่องเดียว)
+WORKS_FILE = os.getenv("WORKS_FILE", "works.json")
+
+# ⏰ งบเวลา (นาที): เลิกเริ่มตอนใหม่ก่อนหมดเวลา เพื่อให้ workflow ยังได้ commit งานที่ทำไปแล้ว
+TIME_BUDGET_MINUTES = float(os.getenv("TIME_BUDGET_MINUTES", "0"))        # 0 = ไม่จำกัด
+BUDGET_RESERVE_MINUTES = float(os.getenv("BUDGET_RESERVE_MINUTES", "10"))  # เผื่อไว้ส่งออก/build/commit
+CHECKPOINT_MINUTES = float(os.getenv("CHECKPOINT_MINUTES", "10"))          # ส่งออก novels.json ระหว่างทาง
+DEFAULT_EPISODE_SECONDS = 180   # ยังไม่มีสถิติ -> เดาว่าตอนละ 3 นาที
+RECENT_SAMPLES = 20
+TIMINGS_FILE = os.path.join(DATA_DIR, "episode_timings.json")
+
+# 🏭 Pipeline: แต่ละขั้นตั้งจำนวน worker แยกกัน
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "2"))            # ดึงหน้า kakuyomu
+TRANSLATE_WORKERS = int(os.getenv("TRANSLATE_WORKERS", "2"))    # แปลพร้อมกันกี่ตอน
+QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))         # ดึงล่วงหน้าได้ไม่เกินกี่ตอน
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "4"))  # เรียก Gemini พร้อมกันได้สูงสุด
+KAKUYOMU_INTERVAL = float(os.getenv("KAKUYOMU_INTERVAL", "1"))  # เว้นระยะต่อ request ไป kakuyomu (วินาที)
+
 if GEMINI_API_KEY:
     try:
         client = genai.Client(api_key=GEMINI_API_KEY)
@@ -31,230 +52,352 @@ scraper = cloudscraper.create_scraper(
     browser={'browser': 'chrome', 'platform': 'windows', 'desktop': True}
 )
 
+store = NovelStore(legacy_json=JSON_DB_FILE, flush_every=1)
+cache = TranslationCache()
+kakuyomu_limiter = HostLimiter(KAKUYOMU_INTERVAL)
+gemini_cap = ConcurrencyCap(GEMINI_CONCURRENCY)
+
 # ==========================================
 # 🛠️ ฟังก์ชันช่วยแปล
 # ==========================================
 
-def translate_title(text):
-    if not client or not text: return text
-    prompt = f"""
-    Translate this Japanese novel title to Thai.
-    Style: Catchy, Short, Natural (Teenager/Light Novel style).
-    Strict Rules: Output ONLY the translated text. No explanations.
-    Original: {text}
-    """
-    try:
-        res = client.models.generate_content(
-            model='gemini-2.5-pro', contents=prompt,
-            config=types.GenerateContentConfig(safety_settings=[
-                types.SafetySetting(category='HARM_CATEGORY_HARASSMENT', threshold='BLOCK_NONE'),
-                types.SafetySetting(category='HARM_CATEGORY_HATE_SPEECH', threshold='BLOCK_NONE'),
-                types.SafetySetting(category='HARM_CATEGORY_SEXUALLY_EXPLICIT', threshold='BLOCK_NONE'),
-                types.SafetySetting(category='HARM_CATEGORY_DANGEROUS_CONTENT', threshold='BLOCK_NONE')
-            ])
-        )
-        return res.text.strip().replace('"', '') if res.text else text
-    except: return text
+# ตัวแปลกลางอยู่ใน translator.py (หั่นตอนยาวเป็นก้อนตามย่อหน้า + ส่งพร้อมกัน + แคช)
+translator = build_translator(client, store, GEMINI_MODEL, cache, cap=gemini_cap)
+gemini, glossary, router = translator.client, translator.glossary, translator.router
+
+def translate_title(text, novel=None):
+    return translator.translate_title(text, novel)
 
 # ==========================================
 # 🛠️ ฟังก์ชันจัดการ JSON
 # ==========================================
 
-def get_novel_title():
-    print(f"📖 กำลังดึงชื่อเรื่องจาก: {NOVEL_MAIN_URL}")
+def load_works():
+    works = read_json(WORKS_FILE) or [{"url": NOVEL_MAIN_URL, "history_file": HISTORY_FILE}]
+    for work in works:
+        work.setdefault("history_file", f"history_{work_id_of(work['url'])}.txt")
+    return works
+
+def get_toc(novel_url):
+    # ดึงหน้าสารบัญครั้งเดียว -> ชื่อเรื่อง + ลิงก์ตอนแรก + ลิสต์ตอนทั้งหมด (kakuyomu.parse_toc)
+    print(f"📖 กำลังดึงสารบัญจาก: {novel_url}")
     try:
-        response = scraper.get(NOVEL_MAIN_URL)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        title_elem = soup.select_one('#workTitle') or soup.select_one('h1')
-        raw_title = title_elem.text.strip() if title_elem else "นิยายไม่ทราบชื่อ"
-        thai_title = translate_title(raw_title)
-        print(f"✅ ชื่อไทย: {thai_title}")
-        return thai_title
+        kakuyomu_limiter.wait(novel_url)
+        with report.stage("fetch", kind="toc", url=novel_url) as ev:
+            r = scraper.get(novel_url, timeout=20)
+            ev["status"] = r.status_code
+        with report.stage("parse", kind="toc", url=novel_url):
+            return parse_toc(r.text, novel_url)
     except Exception as e:
-        print(f"❌ ดึงชื่อเรื่องไม่ได้: {e}")
-        return "นิยายไม่ทราบชื่อ"
+        print(f"⚠️ อ่านสารบัญไม่ได้: {e}")
+        return {"title": None, "first_link": None, "episodes": []}
 
-def save_to_json(novel_title, ep_data):
-    data = {}
-    if os.path.exists(JSON_DB_FILE):
-        with open(JSON_DB_FILE, "r", encoding="utf-8") as f:
-            try:
-                content = f.read()
-                if content: data = json.loads(content)
-                if isinstance(data, list): data = {}
-            except: data = {}
-
-    novel_id = NOVEL_MAIN_URL
-    if novel_id not in data: data[novel_id] = { "title": novel_title, "chapters": [] }
-    
-    data[novel_id]["title"] = novel_title
-    chapters = data[novel_id]["chapters"]
-    existing_idx = next((index for (index, d) in enumerate(chapters) if d["link"] == ep_data["link"]), None)
-    
-    if existing_idx is not None: chapters[existing_idx] = ep_data
-    else: chapters.append(ep_data)
-        
-    data[novel_id]["chapters"] = chapters
-
-    with open(JSON_DB_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-        print(f"💾 บันทึกตอนที่ {ep_data['ep_id']} ลง JSON แล้ว")
+def save_to_json(novel_url, novel_title, ep_data):
+    # flush ทีละตอน (ไฟล์เล็ก) ให้ตรงกับไฟล์ประวัติเสมอ ส่วน novels.json ส่งออกเป็นระยะ (checkpoint) + ตอนจบ
+    with report.stage("save", ep_id=ep_data['ep_id']):
+        store.upsert(novel_url, novel_title, ep_data)
+    print(f"💾 บันทึกตอนที่ {ep_data['ep_id']} ลงคลังแล้ว")
 
 # ==========================================
 # 🛠️ ฟังก์ชัน Crawler & Smart Translate
 # ==========================================
 
-def load_history():
-    if not os.path.exists(HISTORY_FILE): return set()
-    with open(HISTORY_FILE, "r", encoding="utf-8") as f: return set(l.strip() for l in f)
-
-def save_to_history(url):
-    with open(HISTORY_FILE, "a", encoding="utf-8") as f: f.write(url + "\n")
+def load_history(path):
+    if not os.path.exists(path): return set()
+    with open(path, "r", encoding="utf-8") as f: return set(l.strip() for l in f)
 
-def get_first_episode_url():
-    try:
-        r = scraper.get(NOVEL_MAIN_URL)
-        s = BeautifulSoup(r.text, 'html.parser')
-        l = s.select_one('a#readFromFirstEpisode')
-        if l: return urljoin(NOVEL_MAIN_URL, l['href'])
-        ts = re.compile(r'/works/\d+/episodes/\d+')
-        ls = s.find_all('a', href=ts)
-        if ls: 
-            sl = sorted(ls, key=lambda x: int(re.search(r'episodes/(\d+)', x['href']).group(1)))
-            return urljoin(NOVEL_MAIN_URL, sl[0]['href'])
-    except: pass
-    return None
+def save_to_history(path, url):
+    # append + ปิดไฟล์ทุกตอน -> โดนตัดกลางคันก็ยังเก็บตอนที่เสร็จแล้วไว้ครบ
+    with open(path, "a", encoding="utf-8") as f: f.write(url + "\n")
 
-def find_next_link(soup, url):
-    n = soup.select_one('a.widget-episode-navigation-next') or soup.select_one('a#contentMain-readNextEpisode') or soup.find('a', string=re.compile('次のエピソード'))
-    return urljoin(url, n['href']) if n else None
-
-def get_content_and_next_link(url, max=3):
-    h={'Referer': NOVEL_MAIN_URL}
+def get_content_and_next_link(url, referer, max=3):
+    h={'Referer': referer}
     for _ in range(max):
         try:
-            time.sleep(1)
-            r = scraper.get(url, headers=h, timeout=15)
+            kakuyomu_limiter.wait(url)
+            with report.stage("fetch", kind="episode", url=url) as ev:
+                r = scraper.get(url, headers=h, timeout=15)
+                ev["status"] = r.status_code
             if r.status_code==200:
-                s = BeautifulSoup(r.text, 'html.parser')
-                t = s.select_one('.widget-episodeTitle').text.strip()
-                b = s.select_one('.widget-episodeBody').get_text(separator="\n", strip=True)
-                eid = re.search(r'episodes/(\d+)', url).group(1)
-                return {"title":t, "content":b, "next_link":find_next_link(s, url), "ep_id":eid}
-        except: time.sleep(2)
+                with report.stage("parse", kind="episode", url=url):
+                    data = parse_episode(r.text, url)
+                if data['title'] and data['content']: return data
+        except:
+            time.sleep(2); report.record("sleep", 2, reason="retry", url=url)
     return None
 
-def translate_smart(text, retry_count=0):
-    if not client or not text: return None, "Error"
-    
-    # 4 Strategies: Normal -> Soften -> Summary -> Split
-    prompts = [
-        f"แปลนิยายญี่ปุ่นนี้เป็นไทย สำนวนวัยรุ่น (เก็บอารมณ์ครบ):\n{text[:15000]}",
-        f"แปลโดยเลี่ยงคำล่อแหลมและรุนแรง (Soft Version):\n{text[:15000]}",
-        f"สรุปเนื้อเรื่องตอนนี้เป็นภาษาไทย (ตัดฉากเรททิ้ง เล่าแค่เหตุการณ์):\n{text[:15000]}"
-    ]
-
-    # Strategy 1-3
-    if retry_count < 3:
-        try:
-            prompt = prompts[retry_count]
-            if retry_count > 0: print(f"   🔧 แก้เกมรอบที่ {retry_count}...")
-            
-            res = client.models.generate_content(
-                model='gemini-2.5-pro', 
-                contents=prompt,
-                config=types.GenerateContentConfig(safety_settings=[
-                    types.SafetySetting(category='HARM_CATEGORY_HARASSMENT', threshold='BLOCK_NONE'),
-                    types.SafetySetting(category='HARM_CATEGORY_HATE_SPEECH', threshold='BLOCK_NONE'),
-                    types.SafetySetting(category='HARM_CATEGORY_SEXUALLY_EXPLICIT', threshold='BLOCK_NONE'),
-                    types.SafetySetting(category='HARM_CATEGORY_DANGEROUS_CONTENT', threshold='BLOCK_NONE')
-                ])
-            )
-            if res.text and res.text.strip(): return res.text, None
-        except Exception as e:
-            if "429" in str(e): time.sleep(10); return translate_smart(text, retry_count)
-            pass 
-        
-        time.sleep(2)
-        return translate_smart(text, retry_count + 1)
-
-    # Strategy 4: Split Mode
-    if retry_count == 3:
-        print("   ⚔️ ไม้ตายสุดท้าย: หั่นครึ่งแล้วแปล...")
-        try:
-            mid = len(text) // 2
-            r1, _ = translate_smart(text[:mid], 1)
-            r2, _ = translate_smart(text[mid:], 1)
-            full = (r1 or "") + "\n\n--- (ต่อ) ---\n\n" + (r2 or "")
-            if len(full) > 50: return full, None
-        except: pass
+# ==========================================
+# ⏰ งบเวลา: ประเมินเวลาต่อตอนจากสถิติล่าสุด + checkpoint เป็นระยะ
+# ==========================================
+
+class TimeBudget:
+    def __init__(self, minutes, reserve_minutes=BUDGET_RESERVE_MINUTES, checkpoint_minutes=CHECKPOINT_MINUTES):
+        self.start = time.monotonic()
+        self.deadline = self.start + (minutes - reserve_minutes) * 60 if minutes > 0 else None
+        self.checkpoint_every = checkpoint_minutes * 60
+        self._last_checkpoint = self.start
+        self._lock = threading.Lock()
+        self.recent = (read_json(TIMINGS_FILE, {}) or {}).get("recent", [])[-RECENT_SAMPLES:]
+        self.stopped = False
+
+    def estimate(self):
+        # median ของเวลาต่อตอนล่าสุด (ตั้งแต่เริ่มดึงจนบันทึกเสร็จ) ทนค่าโดดจาก 429 ได้ดีกว่าค่าเฉลี่ย
+        with self._lock: recent = sorted(self.recent)
+        return recent[len(recent) // 2] if recent else DEFAULT_EPISODE_SECONDS
+
+    def observe(self, seconds):
+        with self._lock:
+            self.recent = (self.recent + [round(seconds, 1)])[-RECENT_SAMPLES:]
+
+    def can_start(self):
+        # เริ่มตอนใหม่ได้เฉพาะถ้าน่าจะเสร็จก่อนเส้นตาย
+        if self.deadline is None: return True
+        if time.monotonic() + self.estimate() <= self.deadline: return True
+        with self._lock:
+            first, self.stopped = not self.stopped, True
+        if first: print(f"⏰ ใกล้หมดงบเวลา (ตอนละ ~{self.estimate():.0f} วิ) -> ไม่เริ่มตอนใหม่แล้ว")
+        return False
 
-    # Failed
-    return "⚠️ เนื้อหาตอนนี้แรงเกินไป ระบบไม่สามารถแปลได้ (กรุณาอ่านต้นฉบับ)", None
+    def checkpoint_due(self):
+        with self._lock:
+            if time.monotonic() - self._last_checkpoint < self.checkpoint_every: return False
+            self._last_checkpoint = time.monotonic()
+            return True
+
+    def save(self):
+        with self._lock: atomic_write_json(TIMINGS_FILE, {"recent": self.recent})
+
+def checkpoint(budget):
+    # ส่งออก novels.json + สถิติเวลา (ไฟล์ตอนและประวัติถูกเขียนทีละตอนอยู่แล้ว)
+    store.export_json()
+    budget.save()
+    print(f"💾 checkpoint: ส่งออก {JSON_DB_FILE} แล้ว")
 
 # ==========================================
-# 🚀 Main Loop (แก้ไข logic การบันทึก)
+# 🏭 Pipeline: ดึงหน้า -> แปล -> บันทึก (ทำงานซ้อนกัน คิวมีขนาดจำกัด)
 # ==========================================
 
-def main():
-    print("🚀 เริ่มระบบ Web Novel...")
-    
-    novel_title = get_novel_title()
-    completed_urls = load_history()
-    current_url = get_first_episode_url()
-    
-    if not current_url: print("❌ หาตอนแรกไม่เจอ"); return
-
-    ep_count = 1
-    
-    while current_url:
-        print(f"\n[{ep_count}] ตรวจสอบ: {current_url}")
-        
-        if current_url in completed_urls:
-            print("   ⏩ มีในประวัติแล้ว -> ข้าม")
-            data = get_content_and_next_link(current_url) 
-            if data and data['next_link']:
-                current_url = data['next_link']; ep_count += 1; continue
-            else: break
-
-        data = get_content_and_next_link(current_url)
-        if not data: break
-
-        print(f"   ⏳ กำลังแปลชื่อตอน: {data['title']}")
-        thai_chapter_title = translate_title(data['title'])
-        
-        print("   ⏳ กำลังแปลเนื้อหา...")
-        translated_content, err = translate_smart(data['content'])
-        
+_DONE = object()
+
+class Pipeline:
+    def __init__(self, work, novel_title, chain, completed_urls, thai_titles, budget):
+        self.novel_url = work['url']
+        self.history_file = work['history_file']
+        self.budget = budget
+        self.started = {}
+        self.novel_title = novel_title
+        self.completed_urls = completed_urls
+        self.thai_titles = thai_titles
+        self.toc_titles = {e['link']: e.get('title') for e in chain}
+        self.ep_no = {e['link']: i + 1 for i, e in enumerate(chain)}
+        self.next_links = {e['link']: e.get('next_link') for e in chain}
+        self.known = set(self.toc_titles)
+        self.link_q = queue.Queue()
+        self.translate_q = queue.Queue(maxsize=QUEUE_SIZE)
+        self.save_q = queue.Queue(maxsize=QUEUE_SIZE)
+        self._seq_lock = threading.Lock()
+        self._last_seq = -1
+
+    def _enqueue(self, url):
+        with self._seq_lock:
+            self._last_seq += 1
+            self.link_q.put((self._last_seq, url))
+
+    def _follow(self, seq, url, nxt):
+        # ตอนท้ายสุดที่รู้จักยังมีตอนถัดไป (ไม่อยู่ในสารบัญ) -> ไล่ต่อด้วยลิงก์ตอนถัดไป
+        with self._seq_lock:
+            if seq == self._last_seq and nxt and nxt not in self.known:
+                self.known.add(nxt)
+                self.ep_no[nxt] = self.ep_no.get(url, seq + 1) + 1
+                self._last_seq += 1
+                self.link_q.put((self._last_seq, nxt))
+
+    # --- ขั้นที่ 1: ดึงหน้า (ถ้าคิวแปลเต็มจะรอ -> ไม่ดึงล่วงหน้าเกินจำเป็น) ---
+    def fetch_stage(self):
+        while True:
+            item = self.link_q.get()
+            if item is _DONE: self.link_q.task_done(); return
+            seq, url = item
+            data = None
+            try:
+                if url in self.completed_urls:
+                    # แปลแล้วไม่ต้องดึงเนื้อหา แต่ถ้าเป็นตอนท้ายสุด (ไม่มีสารบัญ/รันต่อจากเดิม) ต้องรู้ลิงก์ถัดไป:
+                    # ใช้ next_link ที่จำไว้ใน episode_chain ไม่มี -> ดึงหน้ามาเอาแค่ลิงก์ถัดไป
+                    with self._seq_lock: tail = seq == self._last_seq
+                    if tail:
+                        nxt = self.next_links.get(url)
+                        if not nxt:
+                            page = get_content_and_next_link(url, self.novel_url)
+                            if page:
+                                store.set_next_link(self.novel_url, url, page['next_link'], page['ep_id'], page['title'])
+                                nxt = page['next_link']
+                        self._follow(seq, url, nxt)
+                    continue
+                # ⏰ งบเวลาไม่พอ -> ไม่ดึงตอนนี้ (ส่งต่อเป็น data=None ให้ขั้นบันทึกข้ามไป)
+                if not self.budget.can_start(): continue
+                self.started[seq] = time.monotonic()
+                data = get_content_and_next_link(url, self.novel_url)
+                if data:
+                    store.set_next_link(self.novel_url, url, data['next_link'], data['ep_id'], data['title'])
+                    self._follow(seq, url, data['next_link'])
+            except Exception as e:
+                print(f"   ❌ ดึงหน้าไม่สำเร็จ {url}: {e}")
+            finally:
+                self.translate_q.put((seq, url, data))
+                self.link_q.task_done()
+
+    # --- ขั้นที่ 2: แปล ---
+    def translate_stage(self):
+        while True:
+            item = self.translate_q.get()
+            if item is _DONE: return
+            seq, url, data = item
+            result = None
+            if data and url not in self.completed_urls:
+                try:
+                    if self.toc_titles.get(url) == data['title'] and data['ep_id'] in self.thai_titles:
+                        title = self.thai_titles[data['ep_id']]
+                    else:
+                        title = translate_title(data['title'], self.novel_url)
+                    content, segments, err = translator.translate_segments(data['content'], novel=self.novel_url)
+                    result = (title, content, err, segments)
+                except Exception as e:
+                    result = (None, None, str(e), [])
+            self.save_q.put((seq, url, data, result))
+
+    # --- ขั้นที่ 3: บันทึกเรียงตามลำดับตอน ---
+    def save_stage(self):
+        buffer, next_seq = {}, 0
+        while True:
+            item = self.save_q.get()
+            if item is _DONE: break
+            buffer[item[0]] = item
+            while next_seq in buffer:
+                self._save_safely(buffer.pop(next_seq)); next_seq += 1
+        for seq in sorted(buffer): self._save_safely(buffer.pop(seq))
+
+    def _save_safely(self, item):
+        # บันทึกพัง (เช่นดิสก์เต็ม) -> ข้ามตอนนั้น (ไม่ลงประวัติ รอบหน้าแปลใหม่) ห้ามให้ thread บันทึกตาย
+        # ไม่งั้นขั้นแปลค้างที่ save_q.put ไปจนหมดเวลา step
+        try: self._save(*item)
+        except Exception as e: print(f"   ❌ บันทึกไม่สำเร็จ {item[1]}: {e}")
+
+    def _save(self, seq, url, data, result):
+        print(f"\n[{self.ep_no.get(url, seq + 1)}] ตรวจสอบ: {url}")
+        if url in self.completed_urls:
+            print("   ⏩ มีในประวัติแล้ว -> ข้าม"); return
+        if seq not in self.started:
+            print("   ⏰ หมดงบเวลา -> เก็บไว้รอบหน้า"); return
+        if not data:
+            print("   ❌ ดึงเนื้อหาไม่ได้"); return
+
+        title, translated_content, err, segments = result
         if translated_content:
             # ✅ ตรวจสอบว่าใช่ข้อความ Error หรือไม่
-            is_error_message = "⚠️" in translated_content and "ไม่สามารถแปลได้" in translated_content
+            is_error_message = is_failed(translated_content)
             
             ep_data = {
                 "ep_id": data['ep_id'],
-                "title": thai_chapter_title,
+                "title": title,
                 "content": translated_content,
-                "link": current_url
+                "link": url,
+                "source_hash": source_hash(data['content']),
+                "segments": segments,
             }
-            save_to_json(novel_title, ep_data)
+            save_to_json(self.novel_url, self.novel_title, ep_data)
+            self.budget.observe(time.monotonic() - self.started[seq])
             
             if is_error_message:
                 print("   ⚠️ ติด Safety -> บันทึกแจ้งเตือนลงเว็บ แต่ [ไม่บันทึกประวัติ] (รอรันใหม่)")
             else:
                 print("   ✅ แปลเสร็จสมบูรณ์ -> บันทึกประวัติ")
-                save_to_history(current_url)
-                completed_urls.add(current_url)
+                save_to_history(self.history_file, url)
+                self.completed_urls.add(url)
+            if self.budget.checkpoint_due(): checkpoint(self.budget)
         else:
             print(f"   ❌ เนื้อหาไม่ผ่านเลย: {err}")
 
-        if data['next_link']:
-            print("   ➡️ ไปตอนถัดไป...")
-            current_url = data['next_link']
-            ep_count += 1
-            time.sleep(5)
-        else:
-            print("🏁 จบเรื่อง")
-            break
+    def run(self, start_urls):
+        for url in start_urls:
+            self.known.add(url); self._enqueue(url)
+
+        fetchers = [threading.Thread(target=self.fetch_stage) for _ in range(max(1, FETCH_WORKERS))]
+        translators = [threading.Thread(target=self.translate_stage) for _ in range(max(1, TRANSLATE_WORKERS))]
+        saver = threading.Thread(target=self.save_stage)
+        for t in fetchers + translators + [saver]: t.start()
+
+        # ปิดทีละขั้น: ดึงครบ -> แปลครบ -> บันทึกครบ
+        self.link_q.join()
+        for _ in fetchers: self.link_q.put(_DONE)
+        for t in fetchers: t.join()
+        for _ in translators: self.translate_q.put(_DONE)
+        for t in translators: t.join()
+        self.save_q.put(_DONE)
+        saver.join()
+
+# ==========================================
+# 🚀 Main
+# ==========================================
+
+def seed_history(work):
+    # ยังไม่มีไฟล์ประวัติ (เช่น ไฟล์เดิมไม่เคยถูก commit) -> ถือว่าตอนที่อยู่ในคลังและแปลสำเร็จแล้ว = เสร็จแล้ว
+    done = []
+    for c in store.chapters(work['url']):
+        ep = store.get_chapter(work['url'], c['link']) or {}
+        if ep.get('content') and not is_failed(ep['content']): done.append(c['link'])
+    if done:
+        with open(work['history_file'], "w", encoding="utf-8") as f: f.writelines(l + "\n" for l in done)
+        print(f"📜 สร้าง {work['history_file']} จากคลัง ({len(done)} ตอน)")
+
+def translate_work(work, budget):
+    novel_url = work['url']
+    toc = get_toc(novel_url)
+    raw_title = toc['title']
+    if not os.path.exists(work['history_file']): seed_history(work)
+    completed_urls = load_history(work['history_file'])
+
+    # 📑 ลำดับตอนที่เก็บไว้ + สารบัญล่าสุด -> รู้ตอนถัดไปโดยไม่ต้องโหลดหน้าที่แปลแล้ว
+    chain = store.merge_episode_chain(novel_url, toc['episodes'])
+    pending = [e['link'] for e in chain if e['link'] not in completed_urls]
+    print(f"📑 สารบัญ {len(chain)} ตอน | ค้างแปล {len(pending)} ตอน")
+
+    if chain and not pending and toc['episodes']:
+        print("✅ แปลครบทุกตอนแล้ว"); return
+
+    # 📦 แปลชื่อเรื่อง + ชื่อตอนที่ค้างทั้งหมดในคำขอเดียว (ผลเก็บลงแคช ตอนวนลูปจะไม่เรียก API ซ้ำ)
+    pending_set = set(pending)
+    titles = {e['ep_id']: e.get('title') for e in chain if e['link'] in pending_set}
+    if raw_title: titles["work"] = raw_title
+    thai_titles = translator.translate_titles(titles, novel_url)
+    novel_title = thai_titles.get("work") or store.title(novel_url) or "นิยายไม่ทราบชื่อ"
+    print(f"✅ ชื่อไทย: {novel_title}")
+
+    # ⏩ เริ่มจากตอนที่ยังไม่แปลเท่านั้น
+    # ไม่มีสารบัญและแปลครบตามที่รู้จัก -> เริ่มจากตอนท้ายสุดที่รู้จัก (หรือตอนแรก) แล้วไล่ลิงก์ถัดไปแบบเดิม
+    start_urls = pending or [chain[-1]['link'] if chain else toc['first_link']]
+    if not start_urls[0]: print("❌ หาตอนแรกไม่เจอ"); return
+
+    print(f"🏭 ดึง {FETCH_WORKERS} | แปล {TRANSLATE_WORKERS} | คิว {QUEUE_SIZE}")
+    start = time.time()
+    Pipeline(work, novel_title, chain, completed_urls, thai_titles, budget).run(start_urls)
+    print(f"\n🏁 จบเรื่อง ({time.time() - start:.0f} วินาที)")
+
+def main():
+    print("🚀 เริ่มระบบ Web Novel...")
+    works = load_works()
+    budget = TimeBudget(TIME_BUDGET_MINUTES)
+    if budget.deadline:
+        print(f"⏰ งบเวลา {TIME_BUDGET_MINUTES:.0f} นาที (เผื่อท้าย {BUDGET_RESERVE_MINUTES:.0f}) | ประเมินตอนละ ~{budget.estimate():.0f} วิ")
+
+    for work in works:
+        if not budget.can_start(): break
+        print(f"\n--- 📚 {work['url']} ---")
+        try: translate_work(work, budget)
+        except Exception as e: print(f"❌ {work['url']}: {e}")
+
+    checkpoint(budget)
+    report_summaries(translator)
+    report.write("translate_all")
 
 if __name__ == "__main__":
     main()
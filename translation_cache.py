@@ -0,0 +1,107 @@
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# ==========================================
+# 🗃️ แคชคำแปลบนดิสก์ (key = hash ของต้นฉบับ + โมเดล + กลยุทธ์ prompt)
+# ==========================================
+# รันซ้ำหลังล่ม / ติด safety / check_novel เจอตอนที่ translate_all แปลไปแล้ว -> ไม่ต้องเรียก API ใหม่
+
+CACHE_FILE = os.getenv("TRANSLATION_CACHE_FILE", ".cache/translations.sqlite3")
+CACHE_MAX_MB = float(os.getenv("TRANSLATION_CACHE_MB", "200"))
+
+
+def make_key(text, model, strategy):
+    h = hashlib.sha256()
+    for part in (model, strategy, text):
+        h.update(part.encode("utf-8")); h.update(b"\0")
+    return h.hexdigest()
+
+
+class TranslationCache:
+    def __init__(self, path=CACHE_FILE, max_mb=CACHE_MAX_MB):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY, novel TEXT, model TEXT, strategy TEXT,
+                value TEXT, size INTEGER, used REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_novel ON entries(novel);
+            CREATE INDEX IF NOT EXISTS idx_used ON entries(used);
+        """)
+
+    def get(self, text, model, strategy):
+        return self.get_any(text, [model], strategy)
+
+    def get_any(self, text, models, strategy):
+        return self.lookup(text, models, [strategy])[0]
+
+    def lookup(self, text, models, strategies):
+        # ลองทุกกลยุทธ์ x ทุกโมเดล (เช่นทุกชั้นของ model_router) ตามลำดับ -> (คำแปล, กลยุทธ์) หรือ (None, None)
+        # นับ hit/miss ครั้งเดียวต่อการถาม 1 ครั้ง ไม่ใช่ต่อกลยุทธ์/โมเดลที่ลอง
+        with self._lock:
+            for strategy in strategies:
+                for model in models:
+                    key = make_key(text, model, strategy)
+                    row = self._db.execute("SELECT value FROM entries WHERE key=?", (key,)).fetchone()
+                    if row is None: continue
+                    self.hits += 1
+                    self._db.execute("UPDATE entries SET used=? WHERE key=?", (time.time(), key))
+                    self._db.commit()
+                    return row[0], strategy
+            self.misses += 1
+            return None, None
+
+    def put(self, text, model, strategy, value, novel=None):
+        if not value: return
+        key = make_key(text, model, strategy)
+        size = len(value.encode("utf-8")) + len(key)
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?)",
+                             (key, novel, model, strategy, value, size, time.time()))
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        # เกินขนาด -> ลบตัวที่ไม่ได้ใช้นานที่สุดออกจนกว่าจะเหลือ 90%
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes: return
+        target = int(self.max_bytes * 0.9)
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY used").fetchall():
+            if total <= target: break
+            self._db.execute("DELETE FROM entries WHERE key=?", (key,))
+            total -= size
+
+    def invalidate_novel(self, novel):
+        with self._lock:
+            n = self._db.execute("DELETE FROM entries WHERE novel=?", (novel,)).rowcount
+            self._db.commit()
+            return n
+
+    def stats(self):
+        with self._lock:
+            count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": count, "bytes": size}
+
+    def summary(self):
+        s = self.stats()
+        return f"🗃️ แคชคำแปล: hit {s['hits']} / miss {s['misses']} | {s['entries']} รายการ ({s['bytes'] / 1048576:.1f} MB)"
+
+
+if __name__ == "__main__":
+    # python translation_cache.py stats
+    # python translation_cache.py invalidate <novel_url>
+    cache = TranslationCache()
+    if len(sys.argv) >= 3 and sys.argv[1] == "invalidate":
+        print(f"🧹 ลบแคชของ {sys.argv[2]} แล้ว {cache.invalidate_novel(sys.argv[2])} รายการ")
+    else:
+        print(cache.summary())
@@ -0,0 +1,334 @@
+import contextlib
+import difflib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from google.genai import types
+from gemini_client import GeminiClient, is_retryable
+from model_router import ModelRouter, FAST_MODEL, strip_preamble
+from glossary import GlossaryBook
+from segments import is_failed, paragraphs, paragraph_hash, align_segments
+from run_report import report, usage_tokens
+
+# ==========================================
+# 🧠 ระบบแปลกลาง (ใช้ร่วมกันทั้ง check_novel.py และ translate_all.py)
+# ==========================================
+
+# งบต่อก้อน (ตัวอักษร) ญี่ปุ่น ~1 token/ตัว -> ก้อนละ ~6k token กันโดนตัด/โดนบล็อกทั้งตอน
+CHUNK_CHARS = int(os.getenv("CHUNK_CHARS", "6000"))
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", "3"))
+
+PROMPTS = {
+    "normal": "แปลนิยายญี่ปุ่นนี้เป็นไทย สำนวนวัยรุ่น (เก็บอารมณ์ครบ):\n",
+    "soften": "แปลโดยเลี่ยงคำล่อแหลมและรุนแรง (Soft Version):\n",
+    "summary": "สรุปเนื้อเรื่องตอนนี้เป็นภาษาไทย (ตัดฉากเรททิ้ง เล่าแค่เหตุการณ์):\n",
+}
+STRATEGIES = list(PROMPTS)
+
+TITLE_PROMPT = """
+    Translate this Japanese novel title to Thai.
+    Style: Catchy, Short, Natural (Teenager/Light Novel style).
+    Strict Rules: Output ONLY the translated text. No explanations.
+    Original: {text}
+    """
+
+TITLE_BATCH_PROMPT = """
+    Translate each Japanese light novel title below to Thai.
+    Style: Catchy, Short, Natural (Teenager/Light Novel style).
+    Return a JSON array of objects {{"id": ..., "thai": ...}}, one per input, keeping the same "id".
+    Input:
+    {items}
+    """
+TITLE_BATCH_SIZE = 100
+TITLE_BATCH_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"id": {"type": "STRING"}, "thai": {"type": "STRING"}},
+        "required": ["id", "thai"],
+    },
+}
+
+FALLBACK_TEXT = "⚠️ เนื้อหาตอนนี้แรงเกินไป ระบบไม่สามารถแปลได้ (กรุณาอ่านต้นฉบับ)"
+CHUNK_FALLBACK_TEXT = "⚠️ เนื้อหาช่วงนี้แรงเกินไป ระบบไม่สามารถแปลได้ (กรุณาอ่านต้นฉบับ)"
+
+SAFETY_CONFIG = types.GenerateContentConfig(safety_settings=[
+    types.SafetySetting(category='HARM_CATEGORY_HARASSMENT', threshold='BLOCK_NONE'),
+    types.SafetySetting(category='HARM_CATEGORY_HATE_SPEECH', threshold='BLOCK_NONE'),
+    types.SafetySetting(category='HARM_CATEGORY_SEXUALLY_EXPLICIT', threshold='BLOCK_NONE'),
+    types.SafetySetting(category='HARM_CATEGORY_DANGEROUS_CONTENT', threshold='BLOCK_NONE')
+])
+
+# translate_chunk คืนตัวนี้เมื่อโควตาหมด/retry ครบ (ต่างจาก None = ทุกกลยุทธ์โดนบล็อก)
+RETRY_LATER = object()
+
+# บรรทัดตัดฉาก เช่น ◇◇◇ / ＊＊＊ / ――― / ---
+SCENE_BREAK = re.compile(r'^\s*(?:[◇◆□■＊*☆★◎●○〇†]\s*)+$|^\s*[-―─ー=＝~〜]{3,}\s*$')
+
+
+# ==========================================
+# ✂️ หั่นตอนยาวตามย่อหน้า/ฉาก
+# ==========================================
+
+def _split_long_paragraph(para, budget):
+    # ย่อหน้าเดียวยาวเกินงบ -> ตัดที่จบประโยค (。！？) แทนการตัดกลางคำ
+    parts, cur = [], ""
+    for sentence in re.findall(r'[^。！？!?]*[。！？!?」』]*', para):
+        if not sentence: continue
+        if cur and len(cur) + len(sentence) > budget:
+            parts.append(cur); cur = ""
+        while len(sentence) > budget:
+            parts.append(sentence[:budget]); sentence = sentence[budget:]
+        cur += sentence
+    if cur: parts.append(cur)
+    return parts
+
+
+def split_chunks(text, budget=CHUNK_CHARS):
+    if len(text) <= budget: return [text]
+    chunks, cur, cur_len = [], [], 0
+    for para in text.split("\n"):
+        pieces = _split_long_paragraph(para, budget) if len(para) > budget else [para]
+        for piece in pieces:
+            is_break = bool(SCENE_BREAK.match(piece))
+            # ถึงตัดฉากและก้อนปัจจุบันเกินครึ่งงบแล้ว -> ปิดก้อนตรงนี้ (ตัดตามฉากดีกว่าตัดกลางฉาก)
+            if cur and (cur_len + len(piece) + 1 > budget or (is_break and cur_len > budget // 2)):
+                chunks.append("\n".join(cur)); cur, cur_len = [], 0
+            cur.append(piece); cur_len += len(piece) + 1
+    if cur: chunks.append("\n".join(cur))
+    return chunks
+
+
+# ==========================================
+# 🤖 ตัวแปล
+# ==========================================
+
+class Translator:
+    # client = GeminiClient (คุมโควตา/retry ให้แล้ว)
+    # router = ModelRouter (ชั้น fast -> strong) ไม่ส่งมา = ใช้ model เดียวแบบเดิม
+    def __init__(self, client, model, cache=None, cap=None, workers=CHUNK_WORKERS, glossary=None, router=None):
+        self.client = client
+        self.model = model
+        self.cache = cache
+        self.cap = cap
+        self.glossary = glossary
+        self.router = router or ModelRouter([("main", model)])
+        self.workers = max(1, workers)
+
+    def _generate(self, prompt, config=SAFETY_CONFIG, model=None):
+        # ไม่ระบุโมเดล (เช่นอัปเดตอภิธานศัพท์) -> ชั้นที่ถูกที่สุด
+        with self.cap or contextlib.nullcontext():
+            return self.client.generate_content(model=model or self.router.models[0], contents=prompt, config=config)
+
+    def translate_title(self, text, novel=None, start=0, lookup=True):
+        # start = ชั้นเริ่มต้น (ชื่อที่ไม่ผ่านตรวจจากการแปลแบบรวม -> เริ่มที่ชั้นถัดไปเลย)
+        # lookup=False -> ผู้เรียกถามแคชไปแล้ว (ไม่นับ miss ซ้ำ)
+        if not self.client or not text: return text
+        if self.cache and lookup:
+            cached = self.cache.get_any(text, self.router.models, "title")
+            if cached: return cached
+        for tier in self.router.tiers[start:]:
+            try:
+                with report.stage("title", tier=tier.name, chars=len(text)) as ev:
+                    res = self.router.call(tier, lambda model: self._generate(TITLE_PROMPT.format(text=text), model=model))
+                    ev.update(usage_tokens(res))
+            except Exception: continue
+            title = res.text.strip().replace('"', '') if res.text else None
+            if self.router.accept(tier, text, title, "title"):
+                title = strip_preamble(text, title)
+                if self.cache: self.cache.put(text, tier.model, "title", title, novel)
+                return title
+        return text
+
+    def translate_titles(self, titles, novel=None):
+        # 📦 แปลชื่อตอนทั้งหมด (+ชื่อเรื่อง) ในคำขอเดียว ตอบกลับเป็น JSON แล้วจับคู่กลับด้วย id
+        # titles = {ep_id: ชื่อญี่ปุ่น} -> {ep_id: ชื่อไทย}
+        result, pending, escalate = {}, {}, []
+        for key, text in titles.items():
+            if not text: continue
+            cached = self.cache.get_any(text, self.router.models, "title") if self.cache else None
+            if cached: result[key] = cached
+            else: pending[str(key)] = text
+        if not self.client or not pending: return result
+
+        keys = list(pending)
+        tier = self.router.tiers[0]
+        config = types.GenerateContentConfig(
+            safety_settings=SAFETY_CONFIG.safety_settings,
+            response_mime_type="application/json",
+            response_schema=TITLE_BATCH_SCHEMA,
+        )
+        for i in range(0, len(keys), TITLE_BATCH_SIZE):
+            batch = {k: pending[k] for k in keys[i:i + TITLE_BATCH_SIZE]}
+            print(f"   📦 แปลชื่อรวดเดียว {len(batch)} รายการ")
+            try:
+                items = json.dumps([{"id": k, "text": v} for k, v in batch.items()], ensure_ascii=False)
+                with report.stage("title", tier=tier.name, chars=len(items), batch=len(batch)) as ev:
+                    res = self.router.call(tier, lambda model: self._generate(TITLE_BATCH_PROMPT.format(items=items), config, model))
+                    ev.update(usage_tokens(res))
+                for row in json.loads(res.text or "[]"):
+                    key, thai = str(row.get("id", "")), (row.get("thai") or "").strip().replace('"', '')
+                    if key not in batch or not thai or key in result or key in escalate: continue
+                    if not self.router.accept(tier, batch[key], thai, "title"):
+                        escalate.append(key); continue
+                    result[key] = thai
+                    if self.cache: self.cache.put(batch[key], tier.model, "title", thai, novel)
+            except Exception as e:
+                print(f"   ⚠️ แปลชื่อแบบรวมไม่สำเร็จ: {e}")
+
+        # ตัวที่หลุดหายจากคำตอบ -> แปลทีละชื่อแบบเดิม / ตัวที่ไม่ผ่านตรวจ -> แปลทีละชื่อด้วยชั้นถัดไป
+        missing = [k for k in keys if k not in result]
+        if missing: print(f"   🔁 แปลชื่อที่ขาดทีละรายการ {len(missing)} ชื่อ")
+        for key in missing:
+            result[key] = self.translate_title(pending[key], novel, start=1 if key in escalate else 0, lookup=False)
+        return result
+
+    def translate_chunk(self, text, novel=None, start=0):
+        # 🛡️ ปกติ -> Soften -> Summary เฉพาะก้อนที่มีปัญหา
+        if self.cache:
+            cached, strategy = self.cache.lookup(text, self.router.models, STRATEGIES[start:])
+            if cached:
+                report.record("cache_hit", strategy=strategy, chars=len(text))
+                return cached
+
+        # 🧭 แต่ละกลยุทธ์: โมเดลชั้นถูกก่อน -> โดนบล็อก/ไม่ผ่านตรวจคุณภาพ ค่อยยกไปชั้นถัดไป
+        for i, strategy in enumerate(STRATEGIES[start:], start):
+            if i > 0: print(f"   🔧 แก้เกมรอบที่ {i}...")
+            for tier in self.router.tiers:
+                # 📖 แนบอภิธานศัพท์ของเรื่อง (context cache ของโมเดลนั้น หรือเฉพาะคำที่อยู่ในก้อนนี้)
+                config = self.glossary.config_for(novel, text, SAFETY_CONFIG, tier.model) if self.glossary else SAFETY_CONFIG
+                try:
+                    with report.stage("translate", strategy=strategy, tier=tier.name, attempt=i, chars=len(text)) as ev:
+                        res = self.router.call(tier, lambda model: self._generate(PROMPTS[strategy] + text, config, model))
+                        ev.update(usage_tokens(res), ok=bool(res.text and res.text.strip()))
+                except Exception as e:
+                    # โควตาหมด/retry ครบแล้ว -> เปลี่ยนกลยุทธ์ก็ไม่ช่วย (ชั้นถัดไปโควตาแยกกัน ลองได้) ปล่อยให้รอบหน้าแปลใหม่
+                    if is_retryable(e):
+                        print(f"   ❌ Gemini ไม่ว่าง ({tier.model}): {e}")
+                        if tier is self.router.tiers[-1]: return RETRY_LATER
+                    continue
+                output = res.text if res.text and res.text.strip() else None
+                if self.router.accept(tier, text, output, strategy):
+                    output = strip_preamble(text, output)
+                    if self.cache: self.cache.put(text, tier.model, strategy, output, novel)
+                    return output
+        return None
+
+    def translate_smart(self, text, novel=None):
+        result, _, err = self.translate_segments(text, novel)
+        return result, err
+
+    def translate_segments(self, text, novel=None):
+        # คืน (คำแปล, segments, err) -> segments ว่างถ้ามีก้อนที่แปลไม่ผ่าน (แก้ทีหลังต้องแปลใหม่ทั้งตอน)
+        if not self.client or not text: return None, [], "Error"
+
+        chunks = split_chunks(text)
+        if len(chunks) == 1:
+            results = [self.translate_chunk(text, novel)]
+        else:
+            # ✂️ ตอนยาว -> ส่งทุกก้อนพร้อมกัน แล้วต่อกลับตามลำดับเดิม
+            print(f"   ✂️ แบ่งเป็น {len(chunks)} ก้อน (ก้อนละไม่เกิน {CHUNK_CHARS} ตัวอักษร)")
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(chunks))) as pool:
+                results = list(pool.map(lambda c: self.translate_chunk(c, novel), chunks))
+
+        # ⏳ โควตาหมด ไม่ใช่ติด safety -> ไม่คืนข้อความแจ้งเตือน ผู้เรียกจะไม่บันทึก/ไม่แจ้ง แล้วรอบหน้าแปลใหม่
+        if any(r is RETRY_LATER for r in results): return None, [], "quota"
+        if not any(results): return FALLBACK_TEXT, [], None
+        result = "\n\n".join(r or CHUNK_FALLBACK_TEXT for r in results)
+        self._learn(novel, text, result)
+        if not all(results): return result, [], None
+
+        segments = []
+        for i, (chunk, thai) in enumerate(zip(chunks, results)):
+            if i: segments[-1]["n"] += 1   # บรรทัดว่างจาก "\n\n" ที่ต่อก้อน
+            segments += align_segments(chunk, thai)
+        return result, segments, None
+
+    def revise(self, content, segments, source, novel=None):
+        # ✏️ ต้นฉบับถูกแก้ -> แปลใหม่เฉพาะย่อหน้าที่เปลี่ยน แล้วต่อเข้ากับคำแปลเดิม
+        # คืน (คำแปลใหม่, segments ใหม่, จำนวนช่วงที่แปลใหม่) หรือ None ถ้าทำแบบเฉพาะส่วนไม่ได้
+        lines = (content or "").split("\n")
+        if not segments or sum(s["n"] for s in segments) != len(lines): return None
+
+        new_paras = paragraphs(source)
+        old_hashes = [h for seg in segments for h in seg["src"]]
+        matcher = difflib.SequenceMatcher(None, old_hashes, [paragraph_hash(p) for p in new_paras], autojunk=False)
+        matched = {}
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal": matched.update({i1 + k: j1 + k for k in range(i2 - i1)})
+
+        # segment ที่ย่อหน้าทุกอันยังอยู่ครบและติดกัน -> ใช้คำแปลเดิม
+        kept, i, pos = {}, 0, 0
+        for seg in segments:
+            js = [matched.get(k) for k in range(i, i + len(seg["src"]))]
+            if js and None not in js and js == list(range(js[0], js[0] + len(js))):
+                kept[js[0]] = (seg, lines[pos:pos + seg["n"]])
+            i += len(seg["src"]); pos += seg["n"]
+
+        # บรรทัดว่างระหว่างย่อหน้าในคำแปลเดิม -> ใช้คั่นช่วงที่แปลใหม่กับช่วงเดิมให้หน้าตาเหมือนแปลทั้งตอน
+        filled = [k for k, line in enumerate(lines) if line.strip()]
+        gap = filled[1] - filled[0] - 1 if len(filled) > 1 else 1
+        out_lines, out_segments, pending, blocks = [], [], [], 0
+
+        def append(seg_lines, segs):
+            # บรรทัดว่างที่ตามหลังย่อหน้านับรวมใน segment ก่อนหน้า (ช่วงแปลใหม่/ท้ายตอนเดิมไม่มีบรรทัดว่างตามหลัง)
+            if out_lines and out_lines[-1].strip():
+                out_lines.extend([""] * gap)
+                out_segments[-1] = dict(out_segments[-1], n=out_segments[-1]["n"] + gap)
+            out_lines.extend(seg_lines); out_segments.extend(segs)
+
+        def flush():
+            nonlocal blocks
+            if not pending: return True
+            block = "\n".join(pending)
+            thai, _ = self.translate_smart(block, novel)
+            if not thai or is_failed(thai): return False
+            append(thai.split("\n"), align_segments(block, thai))
+            pending.clear(); blocks += 1
+            return True
+
+        j = 0
+        while j < len(new_paras):
+            if j in kept:
+                if not flush(): return None
+                seg, seg_lines = kept[j]
+                append(seg_lines, [seg])
+                j += len(seg["src"])
+            else:
+                pending.append(new_paras[j]); j += 1
+        if not flush(): return None
+        # ย่อหน้าท้ายตอนเดิมถูกลบ -> ไม่ทิ้งบรรทัดว่างค้างท้ายตอน
+        while out_lines and not out_lines[-1].strip() and out_segments[-1]["n"] > 1:
+            out_lines.pop(); out_segments[-1] = dict(out_segments[-1], n=out_segments[-1]["n"] - 1)
+        return "\n".join(out_lines), out_segments, blocks
+
+    def _learn(self, novel, source, translated):
+        # เก็บชื่อ/ศัพท์จากตอนที่แปลผ่าน (ตอนที่ติด safety คำแปลไม่ครบ ไม่เอามาสอน)
+        if self.glossary and not is_failed(translated):
+            self.glossary.learn(novel, source, translated, self._generate)
+
+
+# ==========================================
+# 🏭 ประกอบตัวแปล + สรุปท้ายรอบ (ใช้ร่วมกันทุกสคริปต์)
+# ==========================================
+
+def build_translator(client, store, model, cache, cap=None):
+    # client = genai.Client ดิบ (None = ไม่มี API key)
+    # ทุกคำขอวิ่งผ่าน GeminiClient (token bucket RPM/TPM + backoff มีเพดาน)
+    # 🧭 โมเดลถูก (GEMINI_FAST_MODEL) แปลก่อน ไม่ผ่านตรวจคุณภาพ/โดนบล็อกค่อยยกไป model (model_router.py)
+    gemini = GeminiClient(client) if client else None
+    router = ModelRouter([("fast", FAST_MODEL), ("strong", model)])
+    glossary = GlossaryBook(store, client, model)
+    return Translator(gemini, model, cache, cap=cap, glossary=glossary, router=router)
+
+
+def report_summaries(translator):
+    # แคช / โควตา Gemini / อภิธานศัพท์ / router -> พิมพ์ + ลง run report
+    if translator.cache: print(translator.cache.summary())
+    if translator.client: print(translator.client.summary())
+    if translator.glossary:
+        print(translator.glossary.summary())
+        report.record("glossary_summary", **translator.glossary.stats)
+    print(translator.router.summary())
+    translator.router.record()